@@ -0,0 +1,103 @@
+import builtins
+import sys
+from contextlib import contextmanager
+from threading import local, Thread
+from time import perf_counter
+
+# Imports, which take less seconds, are left out of the timeline
+MIN_IMPORT_SECONDS = 0.05
+
+
+class StartupProfiler:
+    """
+    Records a timeline of the startup: the imports of new packages, the load stages of start.py and
+    the datasets, which are loaded in the background. The timeline is written to stderr.
+    If the profiler is not enabled, all methods do nothing.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.start = perf_counter()
+        self.events = []
+        self.imports = local()
+        self.original_import = None
+
+    def enable(self):
+        """
+        Start recording. Imports are recorded from now on.
+        """
+        if self.enabled:
+            return
+        self.enabled = True
+        self.original_import = builtins.__import__
+        builtins.__import__ = self.__timed_import
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Record the time of a load stage.
+
+        :param name: str name of the stage in the timeline
+        """
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            if self.enabled:
+                self.events.append(('stage', name, start, perf_counter()))
+
+    def report(self, title: str):
+        """
+        Stop recording the imports and write the timeline to stderr.
+
+        :param title: str last entry of the timeline, e.g. the moment the server is ready
+        """
+        if not self.enabled:
+            return
+        builtins.__import__ = self.original_import
+        lines = ['Startup profile (seconds since start, duration):']
+        for kind, name, start, end in sorted(self.events, key=lambda event: (event[2], -event[3])):
+            lines.append(f'{start - self.start:8.3f} {end - start:8.3f}  {kind:<7} {name}')
+        lines.append(f'{perf_counter() - self.start:8.3f} {"":8}  {title}')
+        self.events = []
+        sys.stderr.write('\n'.join(lines) + '\n')
+
+    def report_datasets(self, handler):
+        """
+        Write the load times of the datasets to stderr, once the background loads of the handler are finished.
+
+        :param handler: FileHandler, which loads the datasets
+        """
+        if not self.enabled:
+            return
+
+        def wait_and_report():
+            handler.wait_for_datasets()
+            lines = [f'Datasets loaded after {perf_counter() - self.start:.3f} s:']
+            for dataset in handler.get_loading_status()['datasets']:
+                lines.append(f'{dataset["seconds"]:8.3f}  {dataset["state"]:<7} {dataset["name"]}')
+            sys.stderr.write('\n'.join(lines) + '\n')
+
+        Thread(target=wait_and_report, name='startup-profiler', daemon=True).start()
+
+    def __timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return self.original_import(name, globals, locals, fromlist, level)
+        # Only the first import of a package is recorded, it contains the time of its nested imports.
+        # Packages, which are imported by it, are indented below it.
+        packages = getattr(self.imports, 'packages', [])
+        package = name.split('.')[0]
+        if package in packages:
+            return self.original_import(name, globals, locals, fromlist, level)
+        self.imports.packages = packages + [package]
+        start = perf_counter()
+        try:
+            return self.original_import(name, globals, locals, fromlist, level)
+        finally:
+            self.imports.packages = packages
+            end = perf_counter()
+            if end - start >= MIN_IMPORT_SECONDS:
+                self.events.append(('import', '  ' * len(packages) + name, start, end))
+
+
+profiler = StartupProfiler()
@@ -0,0 +1,115 @@
+import mimetypes
+from os import stat
+from os.path import isfile
+from logging import getLogger
+
+from flask import Response, request, abort
+from werkzeug.http import http_date
+from werkzeug.security import safe_join
+from werkzeug.wsgi import wrap_file
+
+# Track files change at the same URL (converted again, hot reloaded), so browsers revalidate every use.
+# An unchanged file is answered with an empty 304 by its ETag.
+CACHE_CONTROL = 'no-cache'
+
+
+class FileRange:
+    """
+    File-like object, that returns only a byte range of an opened file.
+    It keeps fileno, so that a WSGI server with sendfile support (e.g. gunicorn) sends the range zero-copy
+    starting at the current file position and limited by the Content-Length.
+
+    :param file: opened binary file, positioned at the start of the range
+    :param length: int amount of bytes of the range
+    """
+
+    def __init__(self, file, length: int):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self) -> int:
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+class TrackServer:
+    """
+    Serves the track files for the igv-component. Answers byte range requests with 206 partial content,
+    supports conditional requests with ETag and Last-Modified, so browsers reuse a cached file until it changes.
+
+    :param directory: absolut path of the folder with the track files
+    """
+
+    def __init__(self, directory):
+        self.directory = str(directory)
+        self.logger = getLogger(__name__)
+
+    def send(self, path: str) -> Response:
+        """
+        Return the response for a track file of the current request.
+
+        :param path: str path of the file relative to the track folder
+        :return: 200, 206, 304 or 416 response
+        :rtype: flask.Response
+        """
+        file_path = safe_join(self.directory, path)
+        if file_path is None or not isfile(file_path):
+            abort(404)
+        file_stat = stat(file_path)
+        size = file_stat.st_size
+        etag = f'{file_stat.st_ino:x}-{file_stat.st_mtime_ns:x}-{size:x}'
+        headers = {'ETag': f'"{etag}"',
+                   'Last-Modified': http_date(file_stat.st_mtime),
+                   'Cache-Control': CACHE_CONTROL,
+                   'Accept-Ranges': 'bytes'}
+        if not self.__is_modified(etag, file_stat.st_mtime):
+            return Response(status=304, headers=headers)
+        start, stop = 0, size
+        status = 200
+        byte_range = self.__get_range(etag, file_stat.st_mtime)
+        if byte_range is not None:
+            satisfiable = byte_range.range_for_length(size)
+            if satisfiable is None:
+                headers['Content-Range'] = f'bytes */{size}'
+                return Response(status=416, headers=headers)
+            start, stop = satisfiable
+            status = 206
+            headers['Content-Range'] = f'bytes {start}-{stop - 1}/{size}'
+        headers['Content-Length'] = str(stop - start)
+        file = open(file_path, 'rb')
+        file.seek(start)
+        body = wrap_file(request.environ, FileRange(file, stop - start))
+        return Response(body, status=status, headers=headers,
+                        mimetype=mimetypes.guess_type(file_path)[0] or 'application/octet-stream',
+                        direct_passthrough=True)
+
+    @staticmethod
+    def __is_modified(etag: str, last_modified: float) -> bool:
+        if_none_match = request.if_none_match
+        if if_none_match:
+            return not if_none_match.contains_weak(etag)
+        if request.if_modified_since is not None:
+            return int(last_modified) > request.if_modified_since.timestamp()
+        return True
+
+    @staticmethod
+    def __get_range(etag: str, last_modified: float):
+        byte_range = request.range
+        # Only single ranges are answered with 206, igv.js never asks for multiple ranges
+        if byte_range is None or len(byte_range.ranges) != 1:
+            return None
+        if_range = request.if_range
+        if if_range.etag is not None and if_range.etag != etag:
+            return None
+        if if_range.date is not None and int(last_modified) > if_range.date.timestamp():
+            return None
+        return byte_range
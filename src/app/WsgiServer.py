@@ -0,0 +1,67 @@
+import gc
+import ctypes
+from ctypes.util import find_library
+from logging import getLogger
+
+from gunicorn.app.base import BaseApplication
+
+# BaseApplication uses the attribute logger for its own logger
+logger = getLogger(__name__)
+
+
+class WsgiServer(BaseApplication):
+    """
+    Runs the flask server of the app in a pre-fork gunicorn server. The app is loaded before the workers are forked,
+    so the workers share the loaded annotation and expression tables copy-on-write.
+
+    :param application: flask server of the app
+    :param host: interface on which the server listens
+    :param port: port on which the server listens
+    :param workers: amount of worker processes
+    :param threads: amount of threads of each worker
+    :param post_fork: callable (optional), which is called in each worker after it was forked
+    """
+
+    def __init__(self, application, host: str, port: int, workers: int, threads: int, post_fork=None):
+        self.application = application
+        self.options = {
+            'bind': f'{host}:{port}',
+            'workers': workers,
+            'threads': threads,
+            # Threads are only used by the gthread worker, the sync worker answers one request at a time
+            'worker_class': 'gthread' if threads > 1 else 'sync',
+            'preload_app': True,
+        }
+        self.post_fork = post_fork
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+        if self.post_fork is not None:
+            # Threads do not survive the fork, so threads like the directory watcher are started in each worker
+            self.cfg.set('post_fork', lambda server, worker: self.post_fork())
+
+    def load(self):
+        return self.application
+
+    def run(self):
+        """
+        Start the server and block until it is stopped.
+        """
+        # Objects, which exist before the fork, are moved out of the garbage collection. Otherwise the collector
+        # of each worker writes to their headers and the shared pages are copied.
+        gc.collect()
+        gc.freeze()
+        self.__release_free_memory()
+        logger.info('Starting %d workers with %d threads on %s.',
+                    self.options['workers'], self.options['threads'], self.options['bind'])
+        super().run()
+
+    @staticmethod
+    def __release_free_memory():
+        # Loading leaves freed pages in the heap, which every worker would inherit. Only glibc can return them.
+        try:
+            ctypes.CDLL(find_library('c')).malloc_trim(0)
+        except (OSError, AttributeError, TypeError):
+            pass
@@ -1,15 +1,21 @@
 # Run this app with `python app.py` and
 # visit http://127.0.0.1:8050/ in your web browser, if not set the port to a different location.
 
-from dash.dependencies import Input, Output
+from dash.dependencies import Input, Output, State
 from dash import dcc
 from dash import html
-# Static Default style
-from flask import send_from_directory
 from src.components import DisplayData, SetSettingsByUser
 from src.app.AppInterface import app, server
+from src.app.TrackServer import TrackServer
+from src.app.StartupProfiler import profiler
 from src.input_files.Colors import Color
 from dash_auth import BasicAuth
+from flask import jsonify, request, abort
+
+# Milliseconds between the checks of the loading datasets. While nothing loads, the check stays on at a low rate,
+# because an experiment starts loading, when it is chosen.
+LOADING_INTERVAL = 1000
+IDLE_INTERVAL = 5000
 
 
 class AppHandler:
@@ -19,27 +25,79 @@ class AppHandler:
     :param absolut_dir_path: takes an absolut path to a directory.
     :param component_handler: need the component handler to interact with the filehandler.
     :param port: takes a port as int.
+    :param host: takes the interface, on which the app listens.
+    :param server_mode: 'dev' for the development server of Dash or 'gunicorn' for the pre-fork server.
+    :param workers: amount of worker processes of the gunicorn server.
+    :param threads: amount of threads of each gunicorn worker.
     """
 
-    def __init__(self, absolut_dir_path, component_handler, port, mode, pwd):
-        self.current_gene_options = component_handler.get_current_gene_dict()
+    def __init__(self, absolut_dir_path, component_handler, port, mode, pwd, host='127.0.0.1', server_mode='dev',
+                 workers=1, threads=1):
         self.port = port
-        self.settings = SetSettingsByUser.Settings(component_handler)
-        self.display = DisplayData.Display(component_handler)
+        self.host = host
+        self.server_mode = server_mode
+        self.workers = workers
+        self.threads = threads
+        self.component_handler = component_handler
+        with profiler.stage('create pages'):
+            self.settings = SetSettingsByUser.Settings(component_handler)
+            self.display = DisplayData.Display(component_handler)
         VALID_USERNAME_PASSWORD_PAIRS = {'user': pwd}
         auth = BasicAuth(app, VALID_USERNAME_PASSWORD_PAIRS)
+        track_server = TrackServer(absolut_dir_path)
 
         @server.route('/tracks/<path:path>')
         def data(path) -> server:
             """Evoke that the input_files are available via a server"""
-            return send_from_directory(absolut_dir_path, path)
+            return track_server.send(path)
+
+        @server.route('/region/<path:path>')
+        def region(path) -> server:
+            """Answer the features of a bedGraph or BED track in the requested locus"""
+            try:
+                return jsonify(component_handler.get_region(path, request.args.get('locus')))
+            except FileNotFoundError:
+                abort(404)
+            except (ValueError, TypeError) as error:
+                abort(400, str(error))
+
+        @server.route('/status')
+        def status() -> server:
+            """
+            Answer the progress of the datasets, which are loaded in the background, and the hits and misses of the
+            figure cache. Each gunicorn worker has its own figure cache.
+            """
+            return jsonify(dict(component_handler.get_loading_status(),
+                                figure_cache=component_handler.get_figure_cache_statistics()))
+
+        @app.callback(Output('loading-status', 'children'),
+                      Output('loading-interval', 'interval'),
+                      Input('loading-interval', 'n_intervals'))
+        def display_loading_status(n_intervals) -> tuple[str, int]:
+            """Show the datasets, which are still loading. The polling slows down, once everything is loaded."""
+            loading_status = component_handler.get_loading_status()
+            loading = [f'{dataset["name"]} ({dataset["seconds"]:.0f} s)'
+                       for dataset in loading_status['datasets'] if dataset['state'] == 'loading']
+            failed = [dataset['name'] for dataset in loading_status['datasets'] if dataset['state'] == 'failed']
+            text = ''
+            if loading:
+                text = f'Loading {loading_status["loaded"]} of {loading_status["total"]}: ' + ', '.join(loading)
+            if failed:
+                text += ' Could not load: ' + ', '.join(failed)
+            return text.strip(), IDLE_INTERVAL if loading_status['ready'] else LOADING_INTERVAL
 
         @app.callback(Output('page-content', 'children'),
-                      Input('url', 'pathname'))
-        def display_page(pathname) -> html:
+                      Input('url', 'pathname'),
+                      State('session-genome', 'data'),
+                      State('session-data', 'data'),
+                      State('session-annotation', 'data'),
+                      State('session-expression', 'data'))
+        def display_page(pathname, genome, data, annotation, expression) -> html:
             """Handles the different pages to display."""
             if pathname == '/page1':
-                return self.display.get_layout_for_display()
+                # A reloaded page does not choose the experiment again, so its load is started here as well
+                component_handler.preload_expression(expression)
+                return self.display.get_layout_for_display(genome, data, annotation)
             else:
                 return self.settings.get_layout_for_settings()
 
@@ -47,16 +105,28 @@ class AppHandler:
 
     def runapp(self, mode: bool):
         """This runs the app on the given Port"""
-        app.layout = self.__get_layout(mode)
+        with profiler.stage('create layout'):
+            app.layout = self.__get_layout(mode)
         # This is needed, because callbacks are also called in other input_files.
         app.config.suppress_callback_exceptions = True
-        app.run_server(debug=False, port=self.port)
+        profiler.report('server starts')
+        if self.server_mode == 'gunicorn':
+            # Only imported if it is used, gunicorn is not available on windows
+            from src.app.WsgiServer import WsgiServer
+            WsgiServer(server, self.host, self.port, self.workers, self.threads,
+                       post_fork=self.component_handler.handler.watch).run()
+        else:
+            app.run_server(debug=False, host=self.host, port=self.port)
 
     @staticmethod
     def __pages() -> html.Div:
-        """This method provides the pages"""
+        """This method provides the pages and the choices of the browser session, which both pages share"""
         return html.Div([
             dcc.Location(id='url', refresh=False),
+            dcc.Store(id='session-genome', storage_type='session'),
+            dcc.Store(id='session-annotation', storage_type='session'),
+            dcc.Store(id='session-data', storage_type='session'),
+            dcc.Store(id='session-expression', storage_type='session'),
             html.Div(id='page-content')])
 
     def __get_layout(self, mode: bool) -> html.Div:
@@ -72,4 +142,11 @@ class AppHandler:
             black_or_white = {'backgroundColor': Color.WHITE_HTML.value, 'color': Color.BLACK_HTML.value}
 
         return html.Div(style=black_or_white,
-                        children=[dcc.Loading(self.__pages(), type='circle')])
+                        children=[self.__loading_indicator(), dcc.Loading(self.__pages(), type='circle')])
+
+    @staticmethod
+    def __loading_indicator() -> html.Div:
+        """This method provides the progress of the datasets, which are loaded in the background"""
+        return html.Div([
+            dcc.Interval(id='loading-interval', interval=LOADING_INTERVAL),
+            html.Div(id='loading-status', style={'textAlign': 'center'})])
@@ -0,0 +1,52 @@
+/**
+ * Python like text of a value, so that the texts look the same as the ones of the server.
+ */
+function toPythonText(value) {
+    if (value === null || value === undefined) {
+        return 'None';
+    }
+    if (Array.isArray(value)) {
+        return '[' + value.map(function (item) { return "'" + item + "'"; }).join(', ') + ']';
+    }
+    return String(value);
+}
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    display: {
+        /**
+         * Move the igv browser of the page to the locus of the selected gene and show its coordinate.
+         * The browser is created once per page, so igv.js only fetches the visible region of the tracks instead
+         * of loading the reference and all tracks again. The locus is searched through the search box of igv.js,
+         * because dash-bio does not expose the browser: igv.js is bundled as a module without the global igv
+         * object and a changed locus prop makes dash-bio create a new browser.
+         * In igv.js 2.6.8, which dash-bio 1.0.2 bundles, the search box is the only input of
+         * .igv-search-container and its change handler (jQuery, bound with addEventListener) calls
+         * browser.search with the value. Check this wiring, when dash-bio is updated.
+         */
+        select_gene: function (locus) {
+            if (!locus) {
+                throw window.dash_clientside.PreventUpdate;
+            }
+            const search = function (attempts) {
+                const input = document.querySelector('#locus-igv .igv-search-container input');
+                if (input) {
+                    input.value = locus;
+                    input.dispatchEvent(new Event('change'));
+                } else if (attempts > 0) {
+                    // The browser is still being created
+                    setTimeout(function () { search(attempts - 1); }, 200);
+                }
+            };
+            search(25);
+            return 'The coordinate of the gene is : \n' + locus;
+        }
+    },
+    settings: {
+        /**
+         * Display the selected files and keep them in the store of the browser session.
+         */
+        set_and_display: function (value) {
+            return ['You have selected: ' + toPythonText(value), value];
+        }
+    }
+});
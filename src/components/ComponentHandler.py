@@ -3,86 +3,70 @@
 from src.input_files.File import FileInput
 from src.input_files.Colors import Color
 from src.input_files.FilesHandler import FileHandler
+from src.components.FigureCache import FigureCache
 import plotly.graph_objects as go
+import json
 
 
 class Component:
     """
     The Component handler handel between the FilesHandler and the app.
+    It holds no choices of a user, they are kept per browser session in dcc.Store components and passed in.
 
     :param files_handler: FileHandler takes an Object of FileHandler
     """
 
     def __init__(self, files_handler: FileHandler):
         self.handler = files_handler
-        self.current_genome_file: FileInput = FileInput('', '', '')
-        self.current_index_file: FileInput = FileInput('', '', '')
-        self.genome: list = []
-        self.sequence_files: list = []
-        self.annotation_files: list = []
-        self.expression_files: list = []
-        self.description_files: list = []
-        self.gen: str = ""
-        self.set_genome("")
+        args = files_handler.args
+        self.figure_cache = FigureCache(args.get_figure_cache_size(), args.get_figure_cache_memory() * 1024 * 1024)
+        # Changed files may belong to the experiment of cached figures
+        files_handler.add_listener(lambda filenames: self.figure_cache.invalidate())
 
-    def set_genome(self, filename):
+    def get_genome_file(self, filename: str or None) -> FileInput:
         """
-        Set s specific genome. This has to be loaded first,
-         to return a genome for the igv-component.
+        Return the chosen genome or the first genome, if none was chosen.
 
-        :param filename: str filename of existing input_files.
+        :param filename: str (optional) filename of the genome chosen in the session
+        :return: genome file
+        :rtype: FileInput
+        :raise: NameError if there is no genome
         """
-        self.genome = self.handler.get_genome(filename)
+        if filename:
+            return self.handler.get_specific_file(filename)
+        genome = self.handler.get_genome('')
+        if not genome:
+            raise NameError("File is empty!")
+        return genome[0]
 
-        if filename != "" and filename is not None:
-            self.current_genome_file = self.handler.get_specific_file(filename)
-            # index file has to be in the same directory and must be a fasta index file!
-            self.current_index_file = self.handler.get_specific_file(filename + '.fai')
-        elif len(self.genome) != 0:
-            self.current_genome_file = self.genome[0]
-            self.current_index_file = self.handler.get_specific_file(self.current_genome_file.file_name + '.fai')
-
-    def set_sequence_file(self, filename):
-        """
-        Set a given sequence file.
-
-        :param filename: str filename of existing input_files.
-        """
-        self.sequence_files = self.handler.get_specific_files_as_dict(filename, Color.ORANGE_RGB.value)
-
-    def set_annotation_file(self, filename):
+    def get_current_gene_dict(self) -> dict:
         """
-        Set a given annotation file.
+        Return gene annotation for the dropdown menu.
 
-        :param filename: str filename of existing input_files.
+        :return: Return a dict as json object for the dropdown menu.
+        :rtype: json-object as dict
         """
-        if filename is not None:
-            self.annotation_files = self.handler.get_specific_files_as_dict(filename, Color.GREEN_RGB.value)
+        return self.handler.get_gene_dict([])
 
-    def set_expression_file(self, filename):
+    def search_genes(self, query: str, limit: int, value: str or None) -> list[dict]:
         """
-        Set a given expression file.
+        Return the genes for the dropdown menu, which match the search value.
 
-        :param filename: str filename of existing input_files.
+        :param query: str search value of the dropdown
+        :param limit: int maximum amount of matches
+        :param value: str (optional) current value of the dropdown, which has to stay in the options
+        :return: Return a list of dicts as json object for the dropdown menu.
+        :rtype: list[dict]
         """
-        if filename != "" and filename is not None:
-            self.expression_files = [self.handler.get_specific_file(filename)]
-
-    def set_gen_value(self, gen):
-        self.gen = gen
+        return self.handler.search_genes(query, limit, value)
 
-    def get_current_gene_dict(self) -> dict:
+    def get_region(self, filename: str, locus: str) -> list[dict]:
         """
-        Return gene annotation for the dropdown menu.
+        Return the features of a track in the visible region of the igv-component.
 
-        :return: Return a dict as json object for the dropdown menu.
-        :rtype: json-object as dict
+        :doc: input_files.FilesHandler.FileHandler.get_region
         """
-        if self.description_files:
-            return self.handler.get_gene_dict(self.description_files)
-        if self.annotation_files != "" and self.description_files:
-            return self.handler.get_gene_dict(self.annotation_files)
-        return self.handler.get_gene_dict([])
+        return self.handler.get_region(filename, locus)
 
     def get_annotations(self) -> list[str]:
         """
@@ -101,15 +85,18 @@ class Component:
         """
         return self.handler.get_coverage_files()
 
-    def get_selected_files(self) -> list[dict]:
+    def get_selected_files(self, sequence_files: list[str] or None, annotation_files: list[str] or None) -> list[dict]:
         """
         Return the selected input_files. If none is selected it returns the all file.
 
+        :param sequence_files: list[str] (optional) coverage files chosen in the session
+        :param annotation_files: list[str] (optional) annotation files chosen in the session
         :return: Returns a list of selected sequencing input_files as json-object for the igv-component.
         :rtype: list[json-object]
         """
-        if len(self.sequence_files) > 0 and self.annotation_files:
-            return self.sequence_files + self.annotation_files
+        if sequence_files and annotation_files:
+            return self.handler.get_specific_files_as_dict(sequence_files, Color.ORANGE_RGB.value) + \
+                self.handler.get_specific_files_as_dict(annotation_files, Color.GREEN_RGB.value)
         return self.handler.get_specific_files_as_dict([], color=Color.ORANGE_RGB.value)
 
     def get_genome(self) -> list[FileInput]:
@@ -119,29 +106,32 @@ class Component:
         :return: List of all Input File_type FASTA
         :rtype: list[FileInput]
         """
-        return self.genome
+        return self.handler.get_genome('')
 
-    def get_current_genome_file(self) -> str:
+    def get_current_genome_file(self, filename: str or None) -> str:
         """
         Return the chosen genome file. If there is no file, it will raise NameError
 
+        :param filename: str (optional) filename of the genome chosen in the session
         :return: current server path of the genome file
         :rtype: str
         """
-        if not self.current_genome_file.is_empty():
-            return self.current_genome_file.get_serverpath()
-        raise NameError("File is empty!")
+        return self.get_genome_file(filename).get_serverpath()
 
-    def get_current_index_file(self) -> str:
+    def get_current_index_file(self, filename: str or None) -> str:
         """
         Return the corresponding index file. If there is no file, it will raise NameError.
 
+        :param filename: str (optional) filename of the genome chosen in the session
         :return: current server path of the index file
         :rtype: str
         """
-        if not self.current_index_file.is_empty():
-            return self.current_index_file.get_serverpath()
-        raise NameError(self.current_genome_file.file_name + " corresponding index File is missing!")
+        genome_file = self.get_genome_file(filename)
+        try:
+            # index file has to be in the same directory and must be a fasta index file!
+            return self.handler.get_specific_file(genome_file.get_filename() + '.fai').get_serverpath()
+        except FileNotFoundError:
+            raise NameError(genome_file.get_filename() + " corresponding index File is missing!")
 
     def get_expression_files(self) -> list[str]:
         """
@@ -161,18 +151,51 @@ class Component:
         """
         return self.handler.get_descriptions()
 
-    def get_figure(self, gen_region: str) -> go.Figure:
+    def get_figure(self, expression_file: str or None, gen_region: str) -> dict:
         """
-        Return an expression linegraph with error bars.
+        Return an expression linegraph with error bars. Figures are cached per experiment and gene.
 
+        :param expression_file: str (optional) experiment file chosen in the session
         :param gen_region: Needs the gene region to create a specific Graph for the gene.
-        :return: graph
-        :rtype: go.Figure
+        :return: graph as figure dict for dcc.Graph
+        :rtype: dict
+        """
+        if not expression_file:
+            return go.Figure().to_dict()
+        key = (expression_file, gen_region)
+        figure = self.figure_cache.get(key)
+        if figure is None:
+            file = self.handler.get_specific_file(expression_file)
+            figure = self.handler.get_expression_figure(file, gen_region).to_json()
+            self.figure_cache.put(key, figure)
+        return json.loads(figure)
+
+    def preload_expression(self, expression_file: str or None):
+        """
+        Start loading the chosen experiment in the background, so its first figure does not wait for the load.
+
+        :param expression_file: str (optional) experiment file chosen in the session
+        """
+        # The session may still hold an experiment, which was removed meanwhile
+        if expression_file and expression_file in self.handler.get_expressions():
+            self.handler.preload_expression(self.handler.get_specific_file(expression_file))
+
+    def get_figure_cache_statistics(self) -> dict:
+        """
+        Return the hit and miss counters of the figure cache.
+
+        :return: statistics of the figure cache
+        :rtype: dict
+        """
+        return self.figure_cache.get_statistics()
+
+    def get_loading_status(self) -> dict:
+        """
+        Return the progress of the datasets, which are loaded in the background.
+
+        :doc: input_files.FilesHandler.FileHandler.get_loading_status
         """
-        # TODO: Not only get first expression_files!
-        if self.expression_files:
-            return self.handler.get_expression_figure(self.expression_files[0], gen_region)
-        return go.Figure()
+        return self.handler.get_loading_status()
 
     def dict_is_not_set(self) -> bool:
         return self.handler.is_dict_set()
@@ -1,8 +1,7 @@
-from dash import dcc, html, Input, Output
+from dash import dcc, html, Input, Output, State, ClientsideFunction
 import dash_bio
 
 from dash.exceptions import PreventUpdate
-from plotly import io as pio
 
 from src.app.AppInterface import app
 from src.input_files.Colors import Color
@@ -10,6 +9,8 @@ from src.input_files.Colors import Color
 """This File provides settings to display the specific data and not all data at once. This has a performance reason."""
 Line = {'textAlign': 'left', 'height': '1px', 'width': '1500px', 'backgroundColor': Color.BLACK_HTML.value}
 center = {'textAlign': 'center'}
+# Maximum amount of genes, which are sent to the dropdown per search
+SEARCH_LIMIT = 50
 
 
 class Display:
@@ -20,40 +21,45 @@ class Display:
 
     def __init__(self, component):
         self.component_controller = component
-        self.selected_files = component.get_selected_files()
 
-        @app.callback(
-            Output('igv', 'children'),
+        # The igv component is created once with the page, a selected gene only moves it to the new locus.
+        # This and the coordinate text are handled in the browser, so a selected gene costs one request.
+        app.clientside_callback(
+            ClientsideFunction(namespace='display', function_name='select_gene'),
+            Output('information-output', 'children'),
             Input('Gen-select', 'value'))
-        def return_igv(value: str) -> html.Div:
-            """Return the IGV component with the selected genome."""
-            component.set_gen_value(value)
-            return html.Div([
-                dash_bio.Igv(
-                    id='locus-igv',
-                    locus=value,
-                    reference=self.get_references()
-                )])
 
         @app.callback(
-            Output('information-output', 'children'),
-            Input('Gen-select', 'value'))
-        def update_output(value: str) -> str:
-            if not value:
+            Output('Gen-select', 'options'),
+            Input('Gen-select', 'search_value'),
+            State('Gen-select', 'value'))
+        def search_genes(search_value: str, value: str) -> list[dict]:
+            """Return only the genes, which match the search, instead of sending the whole gene list."""
+            if not search_value:
                 raise PreventUpdate
-            return 'The coordinate of the gene is : \n{}'.format(value)
+            try:
+                return self.component_controller.search_genes(search_value, SEARCH_LIMIT, value)
+            except TimeoutError:
+                return [{'label': 'The annotation is still loading...', 'value': '', 'disabled': True}]
 
         @app.callback(
             Output('graph', 'children'),
-            Input('Gen-select', 'value'))
-        def update_graph(value: str) -> html.Div:
+            Input('Gen-select', 'value'),
+            State('session-expression', 'data'))
+        def update_graph(value: str, expression: str) -> html.Div:
+            """Return the expression graph of the selected gene, the only request of a gene selection."""
             if not value:
                 raise PreventUpdate
-            return html.Div(dcc.Graph(figure=self.component_controller.get_figure(value)), id='plot')
-
-    def __get_dropdown_and_igv(self) -> html.Div:
+            try:
+                figure = self.component_controller.get_figure(expression, value)
+            except TimeoutError:
+                return html.Div('The experiment is still loading, please select the gene again in a moment.',
+                                id='plot', style=center)
+            return html.Div(dcc.Graph(figure=figure), id='plot')
+
+    def __get_dropdown_and_igv(self, genome: str or None, data: list or None, annotation: list or None) -> html.Div:
         """
-        This method provides the Gene-Selection.
+        This method provides the Gene-Selection and the igv-component with the genome and tracks of this session.
 
         :return: the dropdown menu to choose a specific gene
         :rtype: html.Div
@@ -61,27 +67,34 @@ class Display:
         return html.Div([
             dcc.Dropdown(
                 id='Gen-select',
-                options=self.component_controller.get_current_gene_dict(),
-                placeholder='Select a gene...',
+                options=[],
+                placeholder='Search a gene...',
                 style={'color': Color.BLACK_RGB.value}
             ),
-            dcc.Loading(id='igv'),
+            html.Div(id='igv', children=[
+                dash_bio.Igv(
+                    id='locus-igv',
+                    reference=self.get_references(genome, data, annotation)
+                )]),
             html.Div(id='select-gen')
         ])
 
-    def get_references(self) -> dict:
+    def get_references(self, genome: str or None, data: list or None, annotation: list or None) -> dict:
         """
         Return a dict as references for the igv-component.
 
+        :param genome: str (optional) genome chosen in the session
+        :param data: list (optional) coverage files chosen in the session
+        :param annotation: list (optional) annotation files chosen in the session
         :return: reference dict
         :rtype: dict
         """
 
         return dict(id="A.thaliana (TAIR 10)",
                     name="A. thaliana (TAIR 10)",
-                    fastaURL=self.component_controller.get_current_genome_file(),
-                    indexURL=self.component_controller.get_current_index_file(),
-                    tracks=self.component_controller.get_selected_files()
+                    fastaURL=self.component_controller.get_current_genome_file(genome),
+                    indexURL=self.component_controller.get_current_index_file(genome),
+                    tracks=self.component_controller.get_selected_files(data, annotation)
                     )
 
     @staticmethod
@@ -109,15 +122,18 @@ class Display:
             dcc.Loading(id='graph')
         ])
 
-    def get_layout_for_display(self) -> html.Div:
+    def get_layout_for_display(self, genome: str or None, data: list or None, annotation: list or None) -> html.Div:
         """
         Returns the layout of /page1.
 
+        :param genome: str (optional) genome chosen in the session
+        :param data: list (optional) coverage files chosen in the session
+        :param annotation: list (optional) annotation files chosen in the session
         :return: html layout.
         :rtype: html.Div
         """
         return html.Div(children=[
             self.__gene_annotation_area(),
-            self.__get_dropdown_and_igv(),
+            self.__get_dropdown_and_igv(genome, data, annotation),
             self.__set_expression_graph()
         ])
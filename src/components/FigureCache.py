@@ -0,0 +1,81 @@
+from collections import OrderedDict
+from logging import getLogger
+from threading import Lock
+
+
+class FigureCache:
+    """
+    Bounded LRU cache of serialized figures. Entries are evicted, if either the amount of entries
+    or the UTF-8 size of all stored json strings exceeds its limit. A limit of 0 disables the cache.
+
+    :param max_entries: int maximum amount of cached figures
+    :param max_bytes: int maximum size of all cached json strings in bytes
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = Lock()
+        self.logger = getLogger(__name__)
+
+    def get(self, key: tuple) -> str or None:
+        """
+        Return the cached figure and mark it as recently used.
+
+        :param key: tuple of experiment and gene
+        :return: figure as json or None if it is not cached
+        :rtype: str or None
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: tuple, figure: str):
+        """
+        Store a figure. The least recently used figures are evicted to stay within the limits.
+
+        :param key: tuple of experiment and gene
+        :param figure: str figure as json
+        """
+        if self.max_entries <= 0 or self.max_bytes <= 0:
+            return
+        # The limit is in bytes, json strings of gene names or descriptions may hold multibyte characters
+        size = len(figure.encode())
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self.size -= self.entries.pop(key)[1]
+            self.entries[key] = (figure, size)
+            self.size += size
+            while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+                _, (_, evicted_size) = self.entries.popitem(last=False)
+                self.size -= evicted_size
+
+    def invalidate(self):
+        """
+        Remove all cached figures, e.g. if the dataset changed.
+        """
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+        self.logger.debug('Figure cache invalidated.')
+
+    def get_statistics(self) -> dict:
+        """
+        Return the hit and miss counters and the current usage of the cache.
+
+        :return: dict with hits, misses, entries and bytes
+        :rtype: dict
+        """
+        with self.lock:
+            return dict(hits=self.hits, misses=self.misses, entries=len(self.entries), bytes=self.size)
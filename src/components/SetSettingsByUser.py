@@ -1,14 +1,15 @@
 from pathlib import Path
 
-from dash import dcc, html, Input, Output, State
+from dash import dcc, html, Input, Output, State, ClientsideFunction, callback_context, no_update
+from dash.exceptions import PreventUpdate
 
 from src.input_files import File
 from src.app.AppInterface import app
-from src.input_files import Colors
+from src.input_files.Colors import Color
 import base64
 
 """This File provides settings to display the specific data and not all data at once. This has a performance reason."""
-Line = {'textAlign': 'left', 'height': '5px', 'width': '1500px', 'backgroundColor': Colors.BLACK_HTML.value}
+Line = {'textAlign': 'left', 'height': '5px', 'width': '1500px', 'backgroundColor': Color.BLACK_HTML.value}
 center = {'textAlign': 'center'}
 
 
@@ -21,26 +22,32 @@ class Settings:
 
     def __init__(self, component_handler):
         self.component_controller = component_handler
-        self.annotations = component_handler.get_annotations()
-        self.coverages = component_handler.get_coverage_files()
-        self.genome = component_handler.get_genome()
-        self.expression = component_handler.get_expression_files()
-        self.descriptions = component_handler.get_description_files()
-        self.set_sequence = False
+
+        # The selected files are displayed and stored in the browser, they do not need a request
+        for chooser, store, component in [('choose-annotation', 'session-annotation', 'annotation'),
+                                           ('sequence', 'session-data', 'data'),
+                                           ('expression-chooser', 'session-expression', 'expression'),
+                                           ('genome-chooser', 'session-genome', 'genome')]:
+            app.clientside_callback(
+                ClientsideFunction(namespace='settings', function_name='set_and_display'),
+                Output(chooser, 'children'),
+                Output(store, 'data'),
+                Input(component, 'value'))
 
         @app.callback(
-            Output('choose-annotation', 'children'),
-            Input('annotation', 'value'))
-        def set_and_display_annotation_file(value: str) -> str:
+            Output('expression-preload', 'data'),
+            Input('expression', 'value'))
+        def preload_expression_file(value: str) -> str:
             """
-            Set the chosen annotation input_files.
-            Displays for the user the selected.
+            Start loading the chosen experiment, while the user still chooses the other files.
 
-            :return: selected files
+            :return: chosen file
             :rtype: str
             """
-            component_handler.set_annotation_file(value)
-            return f'You have selected: {value}'
+            if not value:
+                raise PreventUpdate
+            self.component_controller.preload_expression(value)
+            return value
 
         @app.callback(
             Output('annotation', 'value'),
@@ -50,23 +57,6 @@ class Settings:
         def select_all_annotation(all_selected, options):
             return [option for option in options if all_selected]
 
-        @app.callback(
-            Output('sequence', 'children'),
-            Input('data', 'value'))
-        def set_and_display_chosen_file(value: str) -> str:
-            """
-            Set the sequence input_files.
-            Displays for the user the selected input_files.
-
-            :return: selected files
-            :rtype: str
-            """
-            component_handler.set_sequence_file(value)
-            if value is not None:
-                self.set_sequence = True
-                self.__is_set_sequence()
-            return f'You have selected: {value}'
-
         @app.callback(
             Output('data', 'value'),
             [Input('select-all', 'value')],
@@ -76,49 +66,34 @@ class Settings:
             return [option for option in options if all_selected]
 
         @app.callback(
-            Output('expression-chooser', 'children'),
-            Input('expression', 'value'))
-        def set_and_display_expression_file(value: str) -> str:
-            """
-            Set the expression input_files.
-            Displays for the user the selected input_files.
-
-            :return: selected file
-            :rtype: str
-            """
-            component_handler.set_expression_file(value)
-            return f'You have selected: {value}'
-
-        @app.callback(
-            Output('genome-chooser', 'children'),
-            Input('genome', 'value'))
-        def set_and_display_genome(value: str) -> str:
-            """
-            Set the genome file.
-            Displays for the user the selected file.
-
-            :return: selected file
-            :rtype: str
-            """
-            component_handler.set_genome(value)
-            return f'You have selected: {value}'
-
-        @app.callback(
+            Output('confirm-danger', 'displayed'),
             Output('output-danger', 'children'),
-            Input('confirm-danger', 'submit_n_clicks'))
-        def update_output(submit_n_clicks) -> dcc.Location:
+            Input('submit-val', 'n_clicks'),
+            Input('confirm-danger', 'submit_n_clicks'),
+            State('session-data', 'data'))
+        def update_output(n_clicks, submit_n_clicks, data) -> tuple[bool, dcc.Location]:
             """
             Check's if the user has selected a sequence file.
-            If not, it pops up a warning message.
+            If not, it pops up a warning message, which has to be confirmed to continue.
 
-            :return: new page
-            :rtype: dcc.Location
+            :return: if the warning is displayed and the new page
+            :rtype: tuple[bool, dcc.Location]
             """
-            # Button has to be set here to confirm that the genome was set
-            # click was not reset, that's why it shows up
-            if submit_n_clicks:
-                return dcc.Location(id='between-venus-and-mars', href='/page1', refresh=True)
-            submit_n_clicks = 0
+            confirmed = callback_context.triggered[0]['prop_id'] == 'confirm-danger.submit_n_clicks'
+            if (confirmed and submit_n_clicks) or (n_clicks and data):
+                return False, dcc.Location(id='between-venus-and-mars', href='/page1', refresh=True)
+            if n_clicks:
+                return True, no_update
+            raise PreventUpdate
+
+    def __get_files(self) -> dict:
+        # Files may be added or removed while the app runs, so the lists are read again for every layout.
+        # They are kept per layout, because server threads render layouts at the same time.
+        return dict(annotations=self.component_controller.get_annotations(),
+                    coverages=self.component_controller.get_coverage_files(),
+                    genome=self.component_controller.get_genome(),
+                    expression=self.component_controller.get_expression_files(),
+                    descriptions=self.component_controller.get_description_files())
 
     @staticmethod
     def __get_img() -> html:
@@ -127,13 +102,14 @@ class Settings:
         return html.Div(style={'textAlign': 'center'}, children=[
             html.Img(src='data:image/svg+xml;base64,{}'.format(encoded_image))])
 
-    def __get_annotations(self) -> str:
-        if len(self.annotations) >= 2:
+    @staticmethod
+    def __get_annotations(annotations: list[str]) -> str:
+        if len(annotations) >= 2:
             return 'Annotation-files'
         return 'Annotation-file'
 
-    def __get_annotation_file_options(self) -> html.Div:
-        label = self.__get_annotations()
+    def __get_annotation_file_options(self, annotations: list[str]) -> html.Div:
+        label = self.__get_annotations(annotations)
         return html.Div([
             html.Div(children=[
                 html.Hr(style=Line),
@@ -144,27 +120,27 @@ class Settings:
                     value=[]
                 ),
                 dcc.Checklist(
-                    options={f'{i}': f'{i}' for i in self.annotations},
+                    options={f'{i}': f'{i}' for i in annotations},
                     id='annotation'
                 ),
                 html.Div(id='choose-annotation')],
                 style={'display': 'block'})
         ])
 
-    def __get_annotation_gene_options(self) -> html:
+    def __get_annotation_gene_options(self, annotations: list[str], descriptions: list[str]) -> html:
         if self.component_controller.dict_is_not_set():
             return html.Div([
                 html.Div(children=[
                     html.Hr(style=Line),
                     html.H2('Choose annotation-file and a description-file', style=center),
                     dcc.RadioItems(
-                        options={f'{i}': f'{i}' for i in self.descriptions},
-                        value=self.descriptions[0],
+                        options={f'{i}': f'{i}' for i in descriptions},
+                        value=descriptions[0],
                         id='desc'
                     ),
                     dcc.Dropdown(
-                        options={f'{i}': f'{i}' for i in self.annotations},
-                        value=self.annotations[0],
+                        options={f'{i}': f'{i}' for i in annotations},
+                        value=annotations[0],
                         id='descAnnotation'
                     ),
                     html.Div(id='choose-descAnnotation')
@@ -172,13 +148,14 @@ class Settings:
             ])
         return ""
 
-    def __get_coverage_annotation(self) -> str:
-        if len(self.coverages) >= 2:
+    @staticmethod
+    def __get_coverage_annotation(coverages: list[str]) -> str:
+        if len(coverages) >= 2:
             return 'Coverage-files'
         return 'Coverage-file'
 
-    def __get_display_sequence_options(self) -> html.Div:
-        label = self.__get_coverage_annotation()
+    def __get_display_sequence_options(self, coverages: list[str]) -> html.Div:
+        label = self.__get_coverage_annotation(coverages)
         return html.Div([
             html.Div(children=[
                 html.Hr(style=Line),
@@ -188,28 +165,20 @@ class Settings:
                     options=[{'label': 'Select All', 'value': 'All'}],
                     value=[]
                 ),
-                dcc.Checklist(options={f'{i}': f'{i}' for i in self.coverages},
+                dcc.Checklist(options={f'{i}': f'{i}' for i in coverages},
                               id='data'),
                 html.Div(id='sequence')
             ])])
 
-    def __get_genome_options(self) -> html.Div:
-        if not self.genome:
+    @staticmethod
+    def __get_genome_options(genome: list[File.FileInput]) -> html.Div:
+        if not genome:
             raise NameError('There was no FASTA-File found.')
-        if type(self.genome) is File.FileInput:
-            return html.Div([
-                html.Div(children=[
-                    html.Hr(style=Line),
-                    html.H1('This genome is set: \n ' + self.genome.get_filename(),
-                            style={'color': '#1db992', 'textAlign': 'center'})
-                ])
-            ])
-        if len(self.genome) == 1:
-            self.genome = self.genome[0]
+        if len(genome) == 1:
             return html.Div([
                 html.Div(children=[
                     html.Hr(style=Line),
-                    html.H1('This genome is set: \n' + self.genome.get_filename(),
+                    html.H1('This genome is set: \n' + genome[0].get_filename(),
                             style={'color': '#1db992', 'textAlign': 'center'})
                 ])
             ])
@@ -217,44 +186,42 @@ class Settings:
             html.Div(children=[
                 html.Hr(style=Line),
                 html.H2('Genome-files', style={'textAlign': 'center'}),
-                dcc.RadioItems(options={f'{i.get_filename()}': f'{i.get_filename()}' for i in self.genome},
-                               value=self.genome[0].get_filename(),  # Set first value
+                dcc.RadioItems(options={f'{i.get_filename()}': f'{i.get_filename()}' for i in genome},
+                               value=genome[0].get_filename(),  # Set first value
                                id='genome'),
                 html.Div(id='genome-chooser')
             ])
         ])
 
-    def __get_expression_label(self) -> str:
-        if not self.expression:
+    @staticmethod
+    def __get_expression_label(expression: list[str]) -> str:
+        if not expression:
             return 'Nothing here'
-        if len(self.expression) > 1:
+        if len(expression) > 1:
             return 'Expression-files'
         return 'Expression-file'
 
-    def __get_display_expression_options(self) -> html:
-        label = self.__get_expression_label()
-        if self.expression:
+    def __get_display_expression_options(self, expression: list[str]) -> html:
+        label = self.__get_expression_label(expression)
+        if expression:
             return html.Div([html.Hr(style=Line),
                              html.H2(label, style=center),
-                             dcc.RadioItems(options={f'{i}': f'{i}' for i in self.expression},
+                             dcc.RadioItems(options={f'{i}': f'{i}' for i in expression},
                                             id='expression'),
-                             html.Div(id='expression-chooser')])
+                             html.Div(id='expression-chooser'),
+                             dcc.Store(id='expression-preload')])
         return ""
 
-    def __get_button_interaction(self) -> html.Div:
-        if self.__is_set_sequence():
-            return html.Div([
-                dcc.ConfirmDialogProvider(
-                    children=html.Button('Submit', n_clicks=0),
-                    id='confirm-danger',
-                    message='No Data-File is chosen!\n '
-                            'Sure you want to continue?'),
-                html.Div(id='output-danger')
-            ], style=center)
-        else:
-            return html.Div([
-                dcc.Link(html.Button('Submit', id='submit-val', n_clicks=0), href='/page1'),
-            ], style={'textAlign': 'center'})
+    @staticmethod
+    def __get_button_interaction() -> html.Div:
+        return html.Div([
+            html.Button('Submit', id='submit-val', n_clicks=0),
+            dcc.ConfirmDialog(
+                id='confirm-danger',
+                message='No Data-File is chosen!\n '
+                        'Sure you want to continue?'),
+            html.Div(id='output-danger')
+        ], style=center)
 
     def get_layout_for_settings(self) -> html.Div:
         """
@@ -263,19 +230,15 @@ class Settings:
         :return: Layout of Settings
         :rtype: html.Div
         """
+        files = self.__get_files()
         return html.Div(children=[
             self.__get_img(),
             html.H2('Select Files to display:'),
             html.Div(style={'textAlign': 'left', 'display': 'block', 'flex-direction': 'column'}, children=[
-                self.__get_genome_options(),
-                self.__get_annotation_file_options(),
-                self.__get_annotation_gene_options(),
-                self.__get_display_sequence_options(),
-                self.__get_display_expression_options(),
+                self.__get_genome_options(files['genome']),
+                self.__get_annotation_file_options(files['annotations']),
+                self.__get_annotation_gene_options(files['annotations'], files['descriptions']),
+                self.__get_display_sequence_options(files['coverages']),
+                self.__get_display_expression_options(files['expression']),
                 self.__get_button_interaction()
             ])])
-
-    def __is_set_sequence(self) -> bool:
-        if self.set_sequence:
-            return True
-        return False
@@ -1,4 +1,4 @@
-from os import listdir, access, R_OK, getcwd
+from os import listdir, access, R_OK, getcwd, cpu_count
 from os.path import isdir
 import sys
 from argparse import ArgumentParser
@@ -54,13 +54,53 @@ class Args:
                                 For Bed12-File it is necessary to add an index.csv file. 
                                 It is important that description and index appear in the filename.''',
                                  type=Path)
+        self.parser.add_argument('-cache', dest='cache', help='''Directory for cached annotation tables.
+                                By default the cache is stored in a hidden folder next to the annotation files.''',
+                                 type=Path)
+        self.parser.add_argument('-compile', dest='compile', help='''Compile the experiment files of -dir and their
+                                Salmon quant files into TPM matrices and exit. Compiled matrices are stored in a hidden
+                                folder next to the experiment file and are opened instead of the quant files.''',
+                                 action='store_true', default=False)
+        self.parser.add_argument('-coverage', dest='coverage', help='''Choose how bedGraph files are sent to the
+                                igv-component. bigwig converts them into bigWig, which igv.js reads with range
+                                requests. zoom sends the visible window from the server and answers wide windows with
+                                precomputed zoom summaries (mean, min, max per bin) of a constant size. Files, which
+                                can not be converted, are always sent as zoom.''',
+                                 choices=['bigwig', 'zoom'], default='bigwig')
+        self.parser.add_argument('-load-workers', dest='load_workers', help='''Amount of parallel workers of each pool,
+                                which loads data in the background: the pool, which loads the annotation, experiments
+                                and tracks, the pool, which reads the Salmon quant files of an experiment, and the
+                                pool, which scans the subdirectories of -dir. At least 1, by default it depends on the
+                                cpu count.''',
+                                 type=int)
+        self.parser.add_argument('-figure-cache-size', dest='figure_cache_size', help='''Maximum amount of
+                                expression figures, which are kept in memory. 0 disables the cache.''',
+                                 type=int, default=128)
+        self.parser.add_argument('-figure-cache-memory', dest='figure_cache_memory', help='''Maximum memory in MB
+                                for the cached expression figures. 0 disables the cache.''', type=int, default=64)
+        self.parser.add_argument('-watch', dest='watch', help='''Interval in seconds, in which -dir is checked for
+                                added, changed and removed files. 0 disables watching.''', type=float, default=5.0)
         # add Port as Parameter
         self.parser.add_argument('-port', dest='port', help='''Choose a port on which the app should run. 
                                 For example -port 8050.''', type=int, default=8050)
+        self.parser.add_argument('-host', dest='host', help='''Choose the interface on which the app listens.
+                                For example -host 0.0.0.0 to be reachable from other machines.''',
+                                 type=str, default='127.0.0.1')
+        self.parser.add_argument('-server', dest='server', help='''Choose the server, which runs the app.
+                                dev starts the single process development server of Dash. gunicorn starts a pre-fork
+                                server, whose workers share the loaded annotation and expression tables.''',
+                                 choices=['dev', 'gunicorn'], default='dev')
+        self.parser.add_argument('-workers', dest='workers', help='''Amount of worker processes of the gunicorn
+                                server. By default it depends on the cpu count.''', type=int)
+        self.parser.add_argument('-threads', dest='threads', help='''Amount of threads of each gunicorn worker.''',
+                                 type=int, default=4)
         # add Password as Parameter
         self.parser.add_argument('-pwd', dest='pwd', help='''Set a general password for this session. Do not use
         spaces between. There is no possibility to set the password to nothing.''', type=str, default='test')
 
+        self.parser.add_argument('-profile-startup', '--profile-startup', dest='profile_startup',
+                                 help='''Write a timeline of the imports and load stages of the startup to stderr.''',
+                                 action='store_true', default=False)
         # add experimental dark mode
         self.parser.add_argument('-dark', help='''Experimental Mode to display the data in a dark mode.''',
                                  action='store_true', default=False)
@@ -94,6 +134,8 @@ class Args:
             return args.anno
         if option == 'dark':
             return args.dark
+        if option == 'compile':
+            return args.compile
         raise TypeError
 
     def get_absolut_path(self, arg: str) -> Path or None:
@@ -185,12 +227,120 @@ class Args:
         """
         return self.parser.parse_args().port
 
+    def get_host(self) -> str:
+        """
+        Return the interface on which the app listens.
+
+        :return: host
+        :rtype: str
+        """
+        return self.parser.parse_args().host
+
+    def get_server(self) -> str:
+        """
+        Return the server, which runs the app.
+
+        :return: 'dev' or 'gunicorn'
+        :rtype: str
+        """
+        return self.parser.parse_args().server
+
+    def get_workers(self) -> int:
+        """
+        Return the amount of worker processes of the gunicorn server.
+
+        :return: amount of workers
+        :rtype: int
+        """
+        workers = self.parser.parse_args().workers
+        if workers:
+            return max(workers, 1)
+        return min(2 * (cpu_count() or 1) + 1, 8)
+
+    def get_threads(self) -> int:
+        """
+        Return the amount of threads of each gunicorn worker.
+
+        :return: amount of threads
+        :rtype: int
+        """
+        return max(self.parser.parse_args().threads, 1)
+
+    def get_cache_directory(self) -> Path or None:
+        """
+        Return the directory for cached tables, or None if the default location should be used.
+
+        :return: cache directory
+        :rtype: Path or None
+        """
+        cache = self.parser.parse_args().cache
+        if cache:
+            return Path(cache).resolve()
+        return None
+
+    def get_load_workers(self) -> int or None:
+        """
+        Return the amount of workers of each pool, which loads data files, or None if it depends on the cpu count.
+
+        :return: amount of workers, at least 1
+        :rtype: int or None
+        """
+        load_workers = self.parser.parse_args().load_workers
+        if load_workers is None:
+            return None
+        return max(load_workers, 1)
+
+    def get_figure_cache_size(self) -> int:
+        """
+        Return the maximum amount of cached expression figures.
+
+        :return: amount of figures, 0 if figures are not cached
+        :rtype: int
+        """
+        return max(self.parser.parse_args().figure_cache_size, 0)
+
+    def get_coverage_mode(self) -> str:
+        """
+        Return how bedGraph files are sent to the igv-component.
+
+        :return: bigwig or zoom
+        :rtype: str
+        """
+        return self.parser.parse_args().coverage
+
+    def get_watch_interval(self) -> float:
+        """
+        Return the interval, in which the data directory is checked for changes.
+
+        :return: seconds, 0 if the directory is not watched
+        :rtype: float
+        """
+        return max(self.parser.parse_args().watch, 0.0)
+
+    def get_figure_cache_memory(self) -> int:
+        """
+        Return the maximum memory for cached expression figures.
+
+        :return: memory in MB, 0 if figures are not cached
+        :rtype: int
+        """
+        return max(self.parser.parse_args().figure_cache_memory, 0)
+
     def get_pwd(self) -> str:
         """
         Return the password that was set, or the default password.
         """
         return self.parser.parse_args().pwd
 
+    def get_profile_startup(self) -> bool:
+        """
+        Return True if a timeline of the startup should be written.
+
+        :return: True if the startup is profiled
+        :rtype: bool
+        """
+        return self.parser.parse_args().profile_startup
+
     def get_mode(self) -> bool:
         """
         Return the mode in which the app is displayed.
@@ -0,0 +1,170 @@
+import hashlib
+import json
+from os import stat, replace, getpid
+from pathlib import Path
+from shutil import rmtree
+from logging import getLogger
+
+import numpy as np
+from pandas import DataFrame, Categorical, Index, factorize
+
+# Increase if the layout of the cached tables changes, old cache files are then ignored
+CACHE_VERSION = 3
+CACHE_FOLDER = '.seqing_cache'
+MANIFEST = 'manifest.json'
+HASH_BLOCK_SIZE = 1 << 20
+
+
+class AnnotationCache:
+    """
+    On-disk cache for the tables derived from the annotation files. Each source file is fingerprinted by path,
+    size, mtime and a content hash. The tables are stored column wise as .npy files in a folder, string columns are
+    dictionary encoded. The columns are opened memory-mapped, so all processes, which load the same annotation,
+    share the pages of the cache instead of holding their own copy. String columns are returned as categoricals,
+    whose codes stay memory-mapped.
+
+    :param cache_dir: Path folder for the cache files. If None, a hidden folder next to the sources is used.
+    """
+
+    def __init__(self, cache_dir: Path or None = None):
+        self.cache_dir = cache_dir
+        self.logger = getLogger(__name__)
+
+    def load(self, sources: list[str]) -> dict or None:
+        """
+        Return the cached tables for the given source files or None, if there is no valid cache entry.
+
+        :param sources: paths of the annotation, index and description files
+        :return: dict with table name as key and DataFrame as value
+        :rtype: dict or None
+        """
+        cache_dir = self.__get_cache_dir(sources)
+        if not (cache_dir / MANIFEST).is_file():
+            return None
+        try:
+            manifest = json.loads((cache_dir / MANIFEST).read_text())
+            if not self.__is_valid(manifest, sources):
+                self.logger.info('Annotation cache %s is outdated.', cache_dir)
+                return None
+            if manifest.get('touched'):
+                self.__update_manifest(cache_dir, manifest)
+            return {name: self.__decode_table(cache_dir, name, columns)
+                    for name, columns in manifest['tables'].items()}
+        except (OSError, ValueError, KeyError) as error:
+            self.logger.warning('Could not read annotation cache %s: %s', cache_dir, error)
+            return None
+
+    def store(self, sources: list[str], tables: dict):
+        """
+        Store the tables for the given source files. Failing to write the cache is not an error.
+
+        :param sources: paths of the annotation, index and description files
+        :param tables: dict with table name as key and DataFrame as value
+        """
+        cache_dir = self.__get_cache_dir(sources)
+        arrays = {}
+        manifest = dict(version=CACHE_VERSION,
+                        sources=[self.__get_fingerprint(source, with_hash=True) for source in sources],
+                        tables={})
+        for name, table in tables.items():
+            manifest['tables'][name] = [str(column) for column in table.columns]
+            for column in table.columns:
+                arrays.update(self.__encode_column(name, str(column), table[column]))
+        tmp_dir = cache_dir.with_name(f'.tmp-{getpid()}-{cache_dir.name}')
+        old_dir = cache_dir.with_name(f'.old-{getpid()}-{cache_dir.name}')
+        try:
+            rmtree(tmp_dir, ignore_errors=True)
+            tmp_dir.mkdir(parents=True)
+            for key, values in arrays.items():
+                np.save(tmp_dir / (key + '.npy'), values, allow_pickle=False)
+            # The manifest is written last, a folder without it is never read
+            (tmp_dir / MANIFEST).write_text(json.dumps(manifest))
+            if cache_dir.exists():
+                replace(cache_dir, old_dir)
+            replace(tmp_dir, cache_dir)  # Readers never see a half written cache
+        except OSError as error:
+            self.logger.warning('Could not write annotation cache %s: %s', cache_dir, error)
+        finally:
+            rmtree(tmp_dir, ignore_errors=True)
+            # Processes, which still map the old columns, keep them until they are closed
+            rmtree(old_dir, ignore_errors=True)
+
+    def __get_cache_dir(self, sources: list[str]) -> Path:
+        paths = [str(Path(source).resolve()) for source in sources]
+        key = hashlib.sha1('\n'.join(paths).encode()).hexdigest()[:16]
+        cache_dir = self.cache_dir if self.cache_dir is not None else Path(paths[0]).parent / CACHE_FOLDER
+        return Path(cache_dir) / f'annotation-{key}'
+
+    def __is_valid(self, manifest: dict, sources: list[str]) -> bool:
+        if manifest.get('version') != CACHE_VERSION or len(manifest['sources']) != len(sources):
+            return False
+        for cached, source in zip(manifest['sources'], sources):
+            current = self.__get_fingerprint(source, with_hash=False)
+            if cached['path'] != current['path'] or cached['size'] != current['size']:
+                return False
+            # Only hash the content if the file was touched, an unchanged mtime is trusted
+            if cached['mtime'] != current['mtime']:
+                if cached['hash'] != self.__get_hash(source):
+                    return False
+                # Touched, but unchanged. The new mtime is kept, so the file is not hashed again on every start.
+                cached['mtime'] = current['mtime']
+                manifest['touched'] = True
+        return True
+
+    def __update_manifest(self, cache_dir: Path, manifest: dict):
+        manifest.pop('touched')
+        tmp_manifest = cache_dir / f'.tmp-{getpid()}-{MANIFEST}'
+        try:
+            tmp_manifest.write_text(json.dumps(manifest))
+            replace(tmp_manifest, cache_dir / MANIFEST)
+        except OSError as error:
+            # The cache stays valid, its sources are only hashed again on the next start
+            self.logger.warning('Could not update annotation cache %s: %s', cache_dir, error)
+            tmp_manifest.unlink(missing_ok=True)
+
+    @staticmethod
+    def __get_fingerprint(source: str, with_hash: bool) -> dict:
+        file_stat = stat(source)
+        return dict(path=str(Path(source).resolve()),
+                    size=file_stat.st_size,
+                    mtime=file_stat.st_mtime_ns,
+                    hash=AnnotationCache.__get_hash(source) if with_hash else None)
+
+    @staticmethod
+    def __get_hash(source: str) -> str:
+        content_hash = hashlib.blake2b(digest_size=16)
+        with open(source, 'rb') as file:
+            for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b''):
+                content_hash.update(block)
+        return content_hash.hexdigest()
+
+    @staticmethod
+    def __encode_column(table: str, column: str, values) -> dict:
+        key = f'{table}__{column}'
+        if values.dtype.kind in 'biuf':
+            return {key: values.to_numpy()}
+        codes, uniques = factorize(values)
+        return {key + '__codes': codes.astype(AnnotationCache.__get_code_type(len(uniques))),
+                key + '__uniques': np.asarray(uniques, dtype=str)}
+
+    @staticmethod
+    def __get_code_type(size: int) -> type:
+        # The smallest type, which pandas uses for the codes of a categorical, otherwise it copies the codes
+        for code_type in [np.int8, np.int16, np.int32]:
+            if size < np.iinfo(code_type).max:
+                return code_type
+        return np.int64
+
+    @staticmethod
+    def __decode_table(cache_dir: Path, table: str, columns: list[str]) -> DataFrame:
+        decoded = {}
+        for column in columns:
+            key = f'{table}__{column}'
+            if (cache_dir / (key + '.npy')).is_file():
+                decoded[column] = np.load(cache_dir / (key + '.npy'), mmap_mode='r', allow_pickle=False)
+                continue
+            codes = np.load(cache_dir / (key + '__codes.npy'), mmap_mode='r', allow_pickle=False)
+            # Only the distinct values are held in memory, codes of missing values are -1
+            uniques = np.load(cache_dir / (key + '__uniques.npy'), allow_pickle=False)
+            decoded[column] = Categorical.from_codes(codes, categories=Index(uniques.astype(object)))
+        return DataFrame(decoded, columns=columns, copy=False)
@@ -1,9 +1,14 @@
-from pandas import DataFrame, read_csv, errors
+from pandas import DataFrame, Series, read_csv, errors
 from src.input_files.File_type import Filetype
 from src.input_files.ColumnHeader import Header
 from src.input_files.File import FileInput
-from pybedtools import BedTool
+from src.input_files.GtfReader import GtfReader
+from src.input_files.AnnotationCache import AnnotationCache
+from src.input_files.GeneIndex import GeneIndex
+from src.input_files.GeneSearchIndex import GeneSearchIndex
 from logging import getLogger
+from pathlib import Path
+from time import perf_counter
 import re
 
 
@@ -11,13 +16,19 @@ class Annotation:
     """
     The class Annotation is to handle different Filetypes bed12, gtf and csv files to create
     an object, that can identify to a gene, a description and its corresponding transcripts.
+
+    :param cache_dir: Path (optional) folder for the annotation cache, default is next to the annotation files
     """
 
-    def __init__(self):
+    def __init__(self, cache_dir: Path or None = None):
         self.transcript_to_gene = DataFrame()
         self.gene_with_start_stop = DataFrame()
         self.dropdown_menu = dict()
+        self.gene_index = GeneIndex()
+        self.gene_search_table = DataFrame()
+        self.search_index = GeneSearchIndex()
         self.expression_table = DataFrame
+        self.cache = AnnotationCache(cache_dir)
         self.logger = getLogger(__name__)
 
     def create_dict_for_annotation(self, anno_desc_files: list):
@@ -35,6 +46,36 @@ class Annotation:
         if desc_file is not None:
             anno_desc_files.remove(desc_file)
         file_anno = anno_desc_files[0]  # Last element of the list
+        sources = [str(file.get_filepath()) for file in [file_anno, index_file, desc_file] if file is not None]
+        start = perf_counter()
+        if self.__load_from_cache(sources):
+            self.logger.info('Annotation loaded from cache in %.3f s (warm start).', perf_counter() - start)
+            return
+        self.__parse_annotation(file_anno, index_file, desc_file)
+        self.__get_dict_for_dropdown()
+        self.logger.info('Annotation parsed in %.3f s (cold start).', perf_counter() - start)
+        self.cache.store(sources, {'transcript_to_gene': self.transcript_to_gene,
+                                   'gene_with_start_stop': self.gene_with_start_stop,
+                                   'gene_search_table': self.gene_search_table,
+                                   'dropdown_menu': DataFrame(self.dropdown_menu, columns=['label', 'value'])})
+        # The parsed tables are replaced by the memory-mapped tables of the cache, like on a warm start
+        tables = self.cache.load(sources)
+        if tables is not None:
+            self.transcript_to_gene = tables['transcript_to_gene']
+
+    def __load_from_cache(self, sources: list[str]) -> bool:
+        tables = self.cache.load(sources)
+        if tables is None:
+            return False
+        self.transcript_to_gene = tables['transcript_to_gene']
+        self.gene_with_start_stop = tables['gene_with_start_stop']
+        self.gene_index = GeneIndex(self.gene_with_start_stop)
+        self.gene_search_table = tables['gene_search_table']
+        self.search_index = GeneSearchIndex(self.gene_search_table)
+        self.dropdown_menu = tables['dropdown_menu'].to_dict('records')
+        return True
+
+    def __parse_annotation(self, file_anno: FileInput, index_file: FileInput or None, desc_file: FileInput or None):
         anno_file = file_anno.get_filepath()
         anno_type = file_anno.get_filetype()
         if anno_type == Filetype.BED:
@@ -42,18 +83,17 @@ class Annotation:
             anno = self.__load_file(index_file, Header.NONE)
             self.transcript_to_gene = csv.join(anno.set_index(Header.TRANSCRIPT_ID.value),
                                                on=Header.TRANSCRIPT_ID.value)
-        if anno_type == Filetype.GTF:
-            self.transcript_to_gene = self.__get_gtf_as_table(BedTool(anno_file))
+        elif anno_type in [Filetype.GTF, Filetype.GFF]:
+            self.transcript_to_gene = GtfReader(anno_file).get_table()
         else:
             raise TypeError
         # Add Description to the Genes
         if desc_file is not None:
             desc = self.__load_file(desc_file, Header.DESCRIPTION)
             self.transcript_to_gene = self.transcript_to_gene.merge(
-                desc[[Header.ENSEMBL_GENE_ID.value, Header.DESCRIPTION.value]],
+                desc[[Header.ENSEMBL_GENE_ID.value, Header.DESCRIPTION.value, Header.EXTERNAL_GENE_NAME.value]],
                 how='left', left_on=Header.GENE_ID.value,
                 right_on=Header.ENSEMBL_GENE_ID.value)
-        self.__get_dict_for_dropdown()
 
     def is_empty(self) -> bool:
         """
@@ -71,6 +111,29 @@ class Annotation:
         """
         return self.dropdown_menu
 
+    def search_dropdown(self, query: str, limit: int) -> list[dict]:
+        """
+        Return the dropdown entries, which match the query. Exact and prefix matches of ids and names are ranked
+        before substrings of descriptions.
+        :param query: str part of a gene id, gene name or description, case-insensitive
+        :param limit: int maximum amount of entries
+        :return: Gen-Dicts like in get_dropdown_menu
+        :rtype: list[dict]
+        """
+        return [self.dropdown_menu[row] for row in self.search_index.search(query, limit)]
+
+    def get_dropdown_option(self, locus: str) -> dict or None:
+        """
+        Return the dropdown entry of a gene.
+        :param locus: str value of the entry like CHROMOSOME:START-STOP
+        :return: Gen-Dict or None if the locus is unknown
+        :rtype: dict or None
+        """
+        row = self.gene_index.get_row_by_locus(locus)
+        if row is None:
+            return None
+        return self.dropdown_menu[row]
+
     def get_transcript_to_gene(self) -> DataFrame:
         """
         Return a joined table, where transcript are mapped to its corresponding gene.
@@ -87,50 +150,46 @@ class Annotation:
         """
         return self.gene_with_start_stop
 
-    @staticmethod
-    def __get_gtf_as_table(gtf: BedTool) -> DataFrame:
-        chromosome = []
-        gen_id = []
-        transcript_id = []
-        start = []
-        stop = []
-        for entry in gtf:
-            chromosome.append(entry.chrom)
-            gen_id.append(entry.name)
-            transcript_id.append(entry[Header.TRANSCRIPT_ID.value])
-            start.append(entry.start)
-            stop.append(entry.stop)
-        return DataFrame(list(zip(gen_id, transcript_id, chromosome, start, stop)),
-                         columns=[Header.GENE_ID.value, Header.TRANSCRIPT_ID.value, Header.CHROM.value,
-                                  Header.START.value, Header.STOP.value])
+    def get_gene_index(self) -> GeneIndex:
+        """
+        Return the index to resolve a locus or a gene_id to its row in the gene table.
+        :return: index of the genes
+        :rtype: GeneIndex
+        """
+        return self.gene_index
 
     def __get_dict_for_dropdown(self):
         df = self.transcript_to_gene
-        gen = []
-        start = []
-        stop = []
-        chromosome = []
-        dictionary_for_dropdown = []
-        for name, group in df.groupby(by=[Header.GENE_ID.value]):
-            gen.append(name)
-            min_start = group[Header.START.value].min()
-            start.append(min_start)
-            max_stop = group[Header.STOP.value].max()
-            stop.append(max_stop)
-            chrom = str(group[Header.CHROM.value].iloc[0])
-            chromosome.append(chrom)
-            desc = self.__get_description_if_present(group)
-            dictionary_for_dropdown.append({'label': str(name) + desc,
-                                            'value': chrom + ':' + str(min_start) + '-' + str(max_stop)})
-        self.gene_with_start_stop = DataFrame(list(zip(gen, chromosome, start, stop)),
-                                              columns=[Header.GENE_ID.value, Header.CHROM.value,
-                                                       Header.START.value, Header.STOP.value])
-        self.dropdown_menu = dictionary_for_dropdown
+        aggregation = {Header.CHROM.value: (Header.CHROM.value, 'first'),
+                       Header.START.value: (Header.START.value, 'min'),
+                       Header.STOP.value: (Header.STOP.value, 'max')}
+        for column in [Header.EXTERNAL_GENE_NAME.value, Header.DESCRIPTION.value]:
+            if column in df.columns:
+                aggregation[column] = (column, 'first')
+        genes = df.groupby(by=Header.GENE_ID.value, sort=True).agg(**aggregation).reset_index()
+        self.gene_with_start_stop = genes[[Header.GENE_ID.value, Header.CHROM.value,
+                                           Header.START.value, Header.STOP.value]]
+        self.gene_index = GeneIndex(self.gene_with_start_stop)
+        self.gene_search_table = genes[[column for column in [Header.GENE_ID.value, Header.EXTERNAL_GENE_NAME.value,
+                                                              Header.DESCRIPTION.value] if column in genes.columns]]
+        self.search_index = GeneSearchIndex(self.gene_search_table)
+        labels = (genes[Header.GENE_ID.value].astype(str) + self.__get_name_if_present(genes) +
+                  self.__get_description_if_present(genes))
+        self.dropdown_menu = [{'label': label, 'value': value}
+                              for label, value in zip(labels, self.gene_index.get_loci())]
 
     @staticmethod
-    def __get_description_if_present(df: DataFrame) -> str:
+    def __get_name_if_present(df: DataFrame) -> Series or str:
+        # The name is part of the label, because the dropdown filters the options by label in the browser
+        if Header.EXTERNAL_GENE_NAME.value in df.columns:
+            names = df[Header.EXTERNAL_GENE_NAME.value]
+            return (' (' + names.astype(str) + ')').where(names.notna() & (names != df[Header.GENE_ID.value]), '')
+        return ''
+
+    @staticmethod
+    def __get_description_if_present(df: DataFrame) -> Series or str:
         if Header.DESCRIPTION.value in df.columns:
-            return ' - ' + str(df[Header.DESCRIPTION.value].values[0])
+            return ' - ' + df[Header.DESCRIPTION.value].astype(str)
         return ''
 
     @staticmethod
@@ -160,7 +219,7 @@ class Annotation:
                                 names=[Header.ENSEMBL_GENE_ID.value, Header.DESCRIPTION.value,
                                        Header.EXTERNAL_GENE_NAME.value, Header.GENE_BIOTYPE.value],
                                 sep='\t',
-                                usecols=[0, 1])
+                                usecols=[0, 1, 2])
             else:
                 return read_csv(file, compression='infer',
                                 names=[Header.CHROM.value, Header.START.value, Header.STOP.value,
@@ -22,4 +22,5 @@ class Header(Enum):
     EXTERNAL_GENE_NAME = 'external_gene_name'
     GENE_BIOTYPE = 'gene_biotype'
     INDEX = 'index'
+    ROW = 'row'
     NONE = None
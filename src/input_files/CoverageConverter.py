@@ -0,0 +1,114 @@
+from os import replace, close, chmod
+from tempfile import mkstemp
+from pathlib import Path
+from time import perf_counter
+from logging import getLogger
+
+import numpy as np
+from src.input_files.AnnotationCache import CACHE_FOLDER
+from src.input_files.File_type import Filetype
+from src.input_files.RegionIndex import read_track
+
+try:
+    import pyBigWig
+except ImportError:  # Without pyBigWig the coverage is answered by the region endpoint only
+    pyBigWig = None
+
+BIGWIG_SUFFIX = '.bw'
+
+
+class CoverageConverter:
+    """
+    Converts bedGraph files into bigWig, which igv.js reads with range requests instead of downloading
+    the whole file. The bigWig is cached in a hidden folder next to the source and rebuilt, if the source is newer.
+    The chromosome sizes of the bigWig header are the largest end position per chromosome.
+    """
+
+    def __init__(self):
+        self.logger = getLogger(__name__)
+
+    @staticmethod
+    def is_available() -> bool:
+        """
+        Return True if pyBigWig is installed and files can be converted.
+
+        :return: True if bigWig files can be written
+        :rtype: bool
+        """
+        return pyBigWig is not None
+
+    @staticmethod
+    def get_converted_path(file_path) -> Path:
+        """
+        Return the path of the bigWig, which belongs to a bedGraph.
+
+        :param file_path: path of the bedGraph
+        :return: path of the bigWig in the cache folder
+        :rtype: Path
+        """
+        file_path = Path(file_path)
+        return file_path.parent / CACHE_FOLDER / (file_path.name + BIGWIG_SUFFIX)
+
+    def is_converted(self, file_path) -> bool:
+        """
+        Return True if the bigWig exists and is not older than the bedGraph.
+
+        :param file_path: path of the bedGraph
+        :return: True if the bigWig can be used
+        :rtype: bool
+        """
+        converted = self.get_converted_path(file_path)
+        return converted.is_file() and converted.stat().st_mtime >= Path(file_path).stat().st_mtime
+
+    def convert(self, file_path) -> Path or None:
+        """
+        Convert a bedGraph into bigWig, if there is no up-to-date bigWig yet.
+
+        :param file_path: path of the bedGraph, may be gzipped
+        :return: path of the bigWig or None, if the file could not be converted
+        :rtype: Path or None
+        """
+        if not self.is_available():
+            return None
+        converted = self.get_converted_path(file_path)
+        if self.is_converted(file_path):
+            return converted
+        start_time = perf_counter()
+        table = read_track(file_path, Filetype.BEDGRAPH).sort_values(by=['chr', 'start'], kind='stable')
+        if table.empty:
+            return None
+        temporary = None
+        try:
+            converted.parent.mkdir(parents=True, exist_ok=True)
+            # The name is unique, server workers may convert the same file at once
+            descriptor, temporary = mkstemp(dir=converted.parent, prefix=converted.name, suffix='.tmp')
+            close(descriptor)
+            self.__write(Path(temporary), table)
+            # mkstemp creates the file readable by its owner only
+            chmod(temporary, 0o644)
+            replace(temporary, converted)
+        except (OSError, RuntimeError) as error:
+            # pyBigWig refuses overlapping or unsorted intervals, these files stay on the region endpoint
+            self.logger.warning('Could not convert %s into bigWig: %s', file_path, error)
+            if temporary is not None:
+                Path(temporary).unlink(missing_ok=True)
+            return None
+        self.logger.info('Converted %s into bigWig in %.2f s.', file_path, perf_counter() - start_time)
+        return converted
+
+    @staticmethod
+    def __write(path: Path, table):
+        groups = table.groupby(by='chr', sort=True)
+        header = [(str(chrom), int(group['end'].max())) for chrom, group in groups]
+        bigwig = pyBigWig.open(str(path), 'w')
+        if bigwig is None:
+            raise OSError(f'Can not write {path}')
+        try:
+            bigwig.addHeader(header)
+            for chrom, group in groups:
+                bigwig.addEntries([str(chrom)] * len(group),
+                                  group['start'].to_numpy(dtype=np.int64).tolist(),
+                                  ends=group['end'].to_numpy(dtype=np.int64).tolist(),
+                                  values=group['value'].to_numpy(dtype=np.float64).tolist())
+        finally:
+            bigwig.close()
@@ -0,0 +1,158 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, Future, wait
+from threading import Lock
+from time import perf_counter
+from logging import getLogger
+
+LOADING = 'loading'
+READY = 'ready'
+FAILED = 'failed'
+
+
+class DatasetLoader:
+    """
+    Loads datasets like the annotation, experiments and tracks in a pool of background threads, so the server
+    starts without waiting for them. Each dataset is loaded once under its key: a request for a dataset,
+    which is being loaded, waits for the same load. A failed load is reported and tried again on the next request.
+
+    :param workers: int (optional) amount of threads. Default depends on the cpu count.
+    """
+
+    def __init__(self, workers: int or None = None):
+        self.workers = workers
+        self.executor = None
+        self.loads = dict()
+        # Running loads of forgotten datasets by key
+        self.forgotten = dict()
+        self.lock = Lock()
+        self.logger = getLogger(__name__)
+        if hasattr(os, 'register_at_fork'):
+            # Threads do not survive a fork, a forked server worker starts its own pool on demand
+            os.register_at_fork(after_in_child=self.__reset_executor)
+
+    def submit(self, key, label: str, function, *args) -> Future:
+        """
+        Start loading a dataset, if it is neither loaded nor being loaded. A load of a forgotten dataset,
+        which still runs, is finished first, so two loads never write the same files at once.
+
+        :param key: hashable key of the dataset
+        :param label: str name of the dataset in the status
+        :param function: callable, which loads the dataset and returns it
+        :param args: arguments of the function
+        :return: Future of the dataset, pass it to result to wait for the dataset
+        :rtype: Future
+        """
+        with self.lock:
+            load = self.loads.get(key)
+            if load is not None and not (load['future'].done() and load['future'].exception() is not None):
+                return load['future']
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='dataset-loader')
+            previous = self.forgotten.pop(key, None)
+            load = dict(label=label, start=perf_counter(), end=None)
+            load['future'] = self.executor.submit(self.__run, load, previous, function, *args)
+            self.loads[key] = load
+            return load['future']
+
+    def get_future(self, key) -> Future or None:
+        """
+        Return the Future of a submitted dataset.
+
+        :param key: key of the dataset
+        :return: Future of the dataset or None if it was not submitted or is forgotten
+        :rtype: Future or None
+        """
+        with self.lock:
+            load = self.loads.get(key)
+        return None if load is None else load['future']
+
+    @staticmethod
+    def result(future: Future, timeout: float or None = None):
+        """
+        Return a dataset, waiting at most timeout seconds for its load.
+
+        :param future: Future returned by submit
+        :param timeout: float (optional) seconds to wait, None waits until the dataset is loaded
+        :return: the dataset
+        :raise: TimeoutError if it is not loaded in time, otherwise the exception of the failed load
+        """
+        done, _ = wait([future], timeout=timeout)
+        if not done:
+            raise TimeoutError('The dataset is still loading.')
+        return future.result()
+
+    def is_loading(self, key) -> bool:
+        """
+        Return True if the dataset is being loaded.
+
+        :param key: key of the dataset
+        :return: True while the dataset is loading
+        :rtype: bool
+        """
+        with self.lock:
+            load = self.loads.get(key)
+        return load is not None and not load['future'].done()
+
+    def forget(self, key):
+        """
+        Drop a dataset, e.g. if its file changed. A running load is not interrupted, but its result is dropped
+        and the next load of the dataset waits for it.
+
+        :param key: key of the dataset
+        """
+        with self.lock:
+            load = self.loads.pop(key, None)
+            if load is not None and not load['future'].done():
+                self.forgotten[key] = load['future']
+
+    def wait(self):
+        """
+        Block until all submitted datasets are loaded or failed.
+        """
+        with self.lock:
+            futures = [load['future'] for load in self.loads.values()] + list(self.forgotten.values())
+        wait(futures)
+
+    def get_status(self) -> dict:
+        """
+        Return the progress of the loads.
+
+        :return: dict with ready (True if nothing is loading), loaded and total counts and
+            the state, label and seconds of every dataset
+        :rtype: dict
+        """
+        now = perf_counter()
+        with self.lock:
+            loads = list(self.loads.values())
+        datasets = []
+        for load in loads:
+            future = load['future']
+            if not future.done():
+                state, error = LOADING, None
+            elif future.exception() is not None:
+                state, error = FAILED, str(future.exception())
+            else:
+                state, error = READY, None
+            datasets.append(dict(name=load['label'], state=state, error=error,
+                                 seconds=round((load['end'] or now) - load['start'], 2)))
+        loaded = sum(dataset['state'] != LOADING for dataset in datasets)
+        return dict(ready=loaded == len(datasets), loaded=loaded, total=len(datasets), datasets=datasets)
+
+    def __run(self, load: dict, previous: Future or None, function, *args):
+        if previous is not None:
+            # Submitted earlier to the same pool, so it is already running or done
+            wait([previous])
+        load['start'] = perf_counter()
+        try:
+            dataset = function(*args)
+        except Exception:
+            self.logger.exception('Could not load %s.', load['label'])
+            raise
+        finally:
+            load['end'] = perf_counter()
+        self.logger.info('Loaded %s in %.2f s.', load['label'], load['end'] - load['start'])
+        return dataset
+
+    def __reset_executor(self):
+        self.executor = None
+        self.lock = Lock()
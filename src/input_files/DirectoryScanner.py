@@ -0,0 +1,169 @@
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from os import scandir, sep
+from os.path import basename, join
+from pathlib import Path
+from logging import getLogger
+
+from src.input_files.File_type import Filetype
+
+# Suffixes, also compound ones, and their filetype. Zipped files are only supported for bedGraph, which is converted.
+SUFFIXES = {
+    '.fa': Filetype.FASTA, '.fas': Filetype.FASTA, '.fasta': Filetype.FASTA,
+    '.fai': Filetype.FASTAINDEX,
+    '.bed': Filetype.BED,
+    '.bedgraph': Filetype.BEDGRAPH, '.bedgraph.gz': Filetype.BEDGRAPH,
+    '.gtf': Filetype.GTF,
+    '.gff': Filetype.GFF, '.gff3': Filetype.GFF,
+    '.bam': Filetype.BAM,
+    '.wig': Filetype.WIG,
+    '.bw': Filetype.bigWIG, '.bigwig': Filetype.bigWIG,
+    '.csv': Filetype.CSV,
+    '.tsv': Filetype.TSV,
+}
+# Longest compound suffix in SUFFIXES, e.g. .bedgraph.gz
+MAX_SUFFIX_PARTS = max(suffix.count('.') for suffix in SUFFIXES)
+# Known files, which are no tracks. They are not opened to sniff their content.
+IGNORED_SUFFIXES = {'.bai', '.csi', '.tbi', '.crai', '.sf', '.npy', '.npz', '.json', '.log', '.md', '.py', '.pyc',
+                    '.html', '.png', '.jpg', '.svg', '.pdf', '.zip', '.tar', '.tmp', '.bak'}
+# Salmon quant files are read by pandas, which infers their compression
+QUANT_SUFFIXES = ('.sf', '.sf.gz', '.sf.bz2', '.sf.xz', '.sf.zip')
+ZONE_IDENTIFIER = ':Zone.Identifier'
+SNIFF_SIZE = 4096
+BIGWIG_MAGIC = (b'\x26\xfc\x8f\x88', b'\x88\x8f\xfc\x26')
+GZIP_MAGIC = b'\x1f\x8b'
+BAM_MAGIC = b'BAM\x01'
+
+
+class DirectoryScanner:
+    """
+    Finds the input files below a directory and classifies them. Directories are read with os.scandir, the
+    subdirectories of one level are read in parallel threads. Hidden files and directories, e.g. the cache folders,
+    are skipped. A file is classified by a single lookup of its suffix, files with an unknown suffix by their
+    first bytes.
+
+    :param workers: int (optional) amount of threads. Default depends on the cpu count.
+    """
+
+    def __init__(self, workers: int or None = None):
+        self.workers = workers
+        self.logger = getLogger(__name__)
+
+    def scan(self, root, recursive: bool = True) -> list[tuple[str, Filetype]]:
+        """
+        Return the classified files below a directory.
+
+        :param root: path of the directory
+        :param recursive: bool if subdirectories are scanned as well
+        :return: path relative to the directory in posix notation and the filetype of each file, sorted by path
+        :rtype: list[tuple[str, Filetype]]
+        """
+        return sorted(item for item in self.__walk(root, recursive, self.__classify) if item[1] != Filetype.NONE)
+
+    def get_modification_times(self, root) -> dict[str, tuple[int, int]]:
+        """
+        Return the modification time and size of all files below a directory without classifying them.
+
+        :param root: path of the directory
+        :return: dict with the path relative to the directory as key and mtime in ns and size as value
+        :rtype: dict[str, tuple[int, int]]
+        """
+        return dict(self.__walk(root, True, self.__stat))
+
+    def __walk(self, root, recursive: bool, inspect) -> list[tuple[str, object]]:
+        root = str(Path(root))
+        found = []
+        directories = [root]
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while directories:
+                results = list(executor.map(lambda directory: self.__scan_directory(directory, inspect), directories))
+                directories = []
+                for files, subdirectories in results:
+                    found.extend(files)
+                    if recursive:
+                        directories.extend(subdirectories)
+        # Slicing the paths is much faster than Path.relative_to for tens of thousands of files
+        prefix = len(join(root, ''))
+        return [(path[prefix:].replace(sep, '/'), value) for path, value in found]
+
+    def get_filetype(self, path: str) -> Filetype:
+        """
+        Return the filetype of a file by its suffix. Files with an unknown suffix are sniffed.
+
+        :param path: str path of the file
+        :return: filetype, Filetype.NONE for unsupported files
+        :rtype: Filetype
+        """
+        name = basename(path).lower()
+        parts = name.split('.')
+        for amount in range(min(MAX_SUFFIX_PARTS, len(parts) - 1), 0, -1):
+            file_type = SUFFIXES.get('.' + '.'.join(parts[-amount:]))
+            if file_type is not None:
+                return self.__check_csv(name) if file_type == Filetype.CSV else file_type
+        if len(parts) > 1 and '.' + parts[-1] in IGNORED_SUFFIXES or name.endswith(QUANT_SUFFIXES):
+            return Filetype.NONE
+        return self.__sniff(path)
+
+    def __scan_directory(self, directory: str, inspect) -> tuple[list[tuple[str, object]], list[str]]:
+        files = []
+        subdirectories = []
+        try:
+            with scandir(directory) as entries:
+                for entry in entries:
+                    # Zone identifiers are alternate data streams of downloaded files, not the files themselves
+                    if entry.name.startswith('.') or entry.name.endswith(ZONE_IDENTIFIER):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirectories.append(entry.path)
+                    elif entry.is_file():
+                        files.append((entry.path, inspect(entry)))
+        except OSError as error:
+            self.logger.warning('Could not scan %s: %s', directory, error)
+        return files, subdirectories
+
+    def __classify(self, entry) -> Filetype:
+        return self.get_filetype(entry.path)
+
+    @staticmethod
+    def __stat(entry) -> tuple[int, int]:
+        stat = entry.stat()
+        return stat.st_mtime_ns, stat.st_size
+
+    def __sniff(self, path: str) -> Filetype:
+        try:
+            with open(path, 'rb') as file:
+                head = file.read(SNIFF_SIZE)
+            if head[:4] in BIGWIG_MAGIC:
+                return Filetype.bigWIG
+            if head.startswith(GZIP_MAGIC):
+                # BAM is a block gzipped binary, which starts with its own magic number
+                decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+                return Filetype.BAM if decompressor.decompress(head, len(BAM_MAGIC)) == BAM_MAGIC else Filetype.NONE
+        except (OSError, zlib.error):
+            return Filetype.NONE
+        if b'\0' in head:
+            return Filetype.NONE
+        for line in head.decode('ascii', errors='replace').splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith('>'):
+                return Filetype.FASTA
+            if line.startswith('##gff-version'):
+                return Filetype.GFF
+            if line.startswith(('fixedStep', 'variableStep')) or 'type=wiggle_0' in line:
+                return Filetype.WIG
+            if line.startswith('track') and 'type=bedGraph' in line:
+                return Filetype.BEDGRAPH
+            break
+        return Filetype.NONE
+
+    @staticmethod
+    def __check_csv(file: str) -> Filetype:
+        if file.find('index') != -1:
+            return Filetype.CSV
+        if file.find('description') != -1:
+            return Filetype.CSV
+        if file.find('experiment') != -1:
+            return Filetype.SF
+        return Filetype.NONE
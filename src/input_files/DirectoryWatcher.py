@@ -0,0 +1,72 @@
+from threading import Thread, Event
+from logging import getLogger
+
+from src.input_files.DirectoryScanner import DirectoryScanner
+
+
+class DirectoryWatcher:
+    """
+    Polls a directory in a daemon thread and reports added, changed and removed files. Only modification time
+    and size of the files are compared, so a poll does not open any file. A file is reported once it did not change
+    between two polls, so files, which are still being copied, are not processed half-written.
+
+    :param directory: path of the watched directory
+    :param scanner: DirectoryScanner, which walks the directory
+    :param interval: float seconds between two polls
+    :param on_change: callable, which gets the list of added or changed and the list of removed relative paths
+    """
+
+    def __init__(self, directory, scanner: DirectoryScanner, interval: float, on_change):
+        self.directory = directory
+        self.scanner = scanner
+        self.interval = interval
+        self.on_change = on_change
+        self.snapshot = dict()
+        self.reported = dict()
+        self.stopped = Event()
+        self.thread = None
+        self.logger = getLogger(__name__)
+
+    def start(self):
+        """
+        Take the first snapshot and start polling.
+        """
+        self.snapshot = self.scanner.get_modification_times(self.directory)
+        self.reported = dict(self.snapshot)
+        self.thread = Thread(target=self.__run, name='directory-watcher', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        Stop polling after the current poll.
+        """
+        self.stopped.set()
+
+    def poll(self) -> tuple[list[str], list[str]]:
+        """
+        Compare the directory with the last snapshot.
+
+        :return: added or changed and removed paths relative to the directory
+        :rtype: tuple[list[str], list[str]]
+        """
+        previous, self.snapshot = self.snapshot, self.scanner.get_modification_times(self.directory)
+        changed = sorted(path for path, stat in self.snapshot.items()
+                         if previous.get(path) == stat and self.reported.get(path) != stat)
+        removed = sorted(path for path in self.reported if path not in self.snapshot)
+        for path in changed:
+            self.reported[path] = self.snapshot[path]
+        for path in removed:
+            del self.reported[path]
+        return changed, removed
+
+    def __run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                changed, removed = self.poll()
+                if changed or removed:
+                    self.logger.info('%d files changed and %d files were removed in %s.',
+                                     len(changed), len(removed), self.directory)
+                    self.on_change(changed, removed)
+            except Exception:
+                # The watcher must survive a failing update, the next poll tries again
+                self.logger.exception('Could not update the files of %s.', self.directory)
@@ -1,21 +1,33 @@
-from pandas import DataFrame, read_csv, concat, errors
+import numpy as np
+from pandas import DataFrame
 from logging import getLogger
 from plotly import graph_objects as go
 from src.input_files.File import FileInput
 from src.input_files.File_type import Filetype
 from src.input_files.ColumnHeader import Header
-from plotly import express
+from src.input_files.ExpressionMatrix import ExpressionMatrix
+from src.input_files.GeneIndex import GeneIndex
+from plotly.colors import qualitative
 
 
 class Expression:
     """
     This class creates an expression graph for each gene and its corresponding transcripts.
+
+    :param workers: int (optional) amount of threads, which read the quant files
     """
 
-    def __init__(self):
+    def __init__(self, workers: int or None = None):
+        self.workers = workers
         self.transcript_to_gene = DataFrame()
-        self.gene_with_start_stop = DataFrame()
-        self.expression_table = DataFrame()
+        self.gene_index = GeneIndex()
+        self.expression_matrix = np.empty((0, 0), dtype=np.float32)
+        self.samples = DataFrame()
+        self.transcript_table = DataFrame()
+        self.gene_slices = dict()
+        self.conditions = DataFrame()
+        self.mean = np.empty((0, 0))
+        self.standard_deviation = np.empty((0, 0))
         self.logger = getLogger(__name__)
 
     def is_empty(self) -> bool:
@@ -25,7 +37,7 @@ class Expression:
         :return: If file is empty
         :rtype: bool
         """
-        return self.expression_table.empty
+        return self.transcript_table.empty
 
     def get_expression_figure(self, gene: str) -> go.Figure:
         """
@@ -35,96 +47,81 @@ class Expression:
         :return: graph
         :rtype: go.Figure
         """
-        gene = self.__get_gen_name(gene)
-        table_for_figure = self.expression_table[self.expression_table[Header.GENE_ID.value].isin([gene])]
-        table_for_figure = table_for_figure.reset_index()
-        table_for_figure = table_for_figure.drop(columns=table_for_figure.columns[0], axis=1)
-        table_for_figure[Header.TPM.value] = table_for_figure[Header.TPM.value].astype(float)
-        return self.__get_transcript_plot(table_for_figure)
+        gene_slice = self.gene_slices.get(self.__get_gen_name(gene))
+        if gene_slice is None:
+            return go.Figure()
+        return self.__get_transcript_plot(*gene_slice)
 
-    def create_expression_file(self, file: FileInput, gene_list_with_transcripts: DataFrame, start_and_stop: DataFrame):
+    def prepare_figures(self):
         """
-        Return an expression linegraph with error bars.
+        Create the figure of one gene. Plotly sets up its figure classes with the first figure, which takes longer
+        than the figure itself. This is done while the experiment is loaded instead of in the first request.
+        """
+        if self.gene_slices:
+            self.__get_transcript_plot(*next(iter(self.gene_slices.values()))).to_json()
 
-        :return: graph
-        :rtype: go.Figure
+    def create_expression_file(self, file: FileInput, gene_list_with_transcripts: DataFrame, gene_index: GeneIndex):
+        """
+        Open the compiled TPM matrix of an experiment and map its transcripts to the genes of the annotation.
+        If the matrix was not compiled yet, it is compiled from the quant files first.
+        The mean and standard deviation of each transcript per condition are calculated once here.
+
+        :param file: FileInput with Filetype.SF
+        :param gene_list_with_transcripts: table, where transcripts are mapped to genes
+        :param gene_index: index of the annotation to resolve the locus of a gene
         """
-        self.gene_with_start_stop = start_and_stop
-        if file.get_filetype() == Filetype.SF:
-            try:
-                load_file = read_csv(file.get_filepath(), compression='infer',
-                                     names=[Header.SAMPLE.value, Header.SAMPLE2.value, Header.REPLICATE.value,
-                                            Header.QUANT_FILE.value], sep=',',
-                                     usecols=[0, 1, 2, 3])
-                length = len(load_file)
-                pos = 1  # skips header
-                name = str(file.get_filepath()).replace(file.file_name, '')
-                absolut_file_path = name + load_file[Header.QUANT_FILE.value].iloc[pos]
-                salmon_data = self.__read_csv_file(absolut_file_path)
-                # Merge first salmon file with master table
-                gene_list_with_transcripts = gene_list_with_transcripts.merge(
-                    salmon_data[[Header.TPM.value, Header.NAME.value]],
-                    how='left', left_on=Header.TRANSCRIPT_ID.value,
-                    right_on=Header.NAME.value).drop(
-                    columns=[Header.NAME.value, Header.CHROM.value, Header.START.value,
-                             Header.STOP.value, Header.DESCRIPTION.value])  # These columns are in no further interests
-                # Set new columns to the table
-                gene_list_with_transcripts = gene_list_with_transcripts.dropna(subset=Header.TPM.value)
-                gene_list_with_transcripts.loc[:, Header.SAMPLE.value] = load_file[Header.SAMPLE.value].iloc[pos]
-                gene_list_with_transcripts.loc[:, Header.SAMPLE2.value] = load_file[Header.SAMPLE2.value].iloc[pos]
-                pos = 2
-                gene_id_list = gene_list_with_transcripts[Header.GENE_ID.value].tolist()
-                transcript_id_list = gene_list_with_transcripts[Header.TRANSCRIPT_ID.value].tolist()
-                while pos < length:
-                    # Create new table
-                    tmp_table = DataFrame()
-                    absolut_file_path = name + load_file[Header.QUANT_FILE.value].iloc[pos]
-                    salmon_data = self.__read_csv_file(absolut_file_path)
-                    # Set same columns as main table
-                    tmp_table.loc[:, Header.GENE_ID.value] = gene_id_list
-                    tmp_table.loc[:, Header.TRANSCRIPT_ID.value] = transcript_id_list
-                    salmon_data = tmp_table.join(salmon_data.set_index([Header.NAME.value]),
-                                                 on=Header.TRANSCRIPT_ID.value)
-                    salmon_data = salmon_data.dropna(subset=[Header.TPM.value])
-                    tmp_table.loc[:, Header.TPM.value] = salmon_data[Header.TPM.value]
-                    tmp_table.loc[:, Header.SAMPLE.value] = load_file[Header.SAMPLE.value].iloc[pos]
-                    tmp_table.loc[:, Header.SAMPLE2.value] = load_file[Header.SAMPLE2.value].iloc[pos]
-                    # Concat new table with main table. With this procedure the table gets extended
-                    gene_list_with_transcripts = concat([gene_list_with_transcripts, tmp_table])
-                    pos += 1
-                self.expression_table = gene_list_with_transcripts
-            except errors.InvalidIndexError:
-                self.logger.error('Column does not match with the names or the amount.')
-                raise
-        else:
+        self.gene_index = gene_index
+        if file.get_filetype() != Filetype.SF:
             raise FileNotFoundError
+        matrix = ExpressionMatrix(file.get_filepath(), self.workers)
+        self.expression_matrix, transcripts, self.samples = matrix.open()
+        # The columns of the annotation may be categoricals, the much shorter mapping is stored as plain strings
+        transcript_to_gene = gene_list_with_transcripts[[Header.GENE_ID.value, Header.TRANSCRIPT_ID.value]] \
+            .drop_duplicates(subset=Header.TRANSCRIPT_ID.value).astype(object).set_index(Header.TRANSCRIPT_ID.value)
+        table = DataFrame({Header.TRANSCRIPT_ID.value: transcripts, Header.ROW.value: np.arange(len(transcripts))})
+        table = table.join(transcript_to_gene, on=Header.TRANSCRIPT_ID.value, how='inner')
+        # Sorted by gene, so that the transcripts of one gene are a contiguous slice
+        self.transcript_table = table.sort_values(by=[Header.GENE_ID.value, Header.TRANSCRIPT_ID.value])[
+            [Header.GENE_ID.value, Header.TRANSCRIPT_ID.value, Header.ROW.value]].reset_index(drop=True)
+        genes, starts = np.unique(self.transcript_table[Header.GENE_ID.value].to_numpy(dtype=str), return_index=True)
+        stops = np.append(starts[1:], len(self.transcript_table))
+        self.gene_slices = {gene: (start, stop) for gene, start, stop in zip(genes, starts, stops)}
+        self.__set_condition_statistics()
 
-    @staticmethod
-    def __read_csv_file(path):
-        try:
-            return read_csv(path, compression='infer', sep='\t',
-                            names=[Header.NAME.value, Header.LENGTH.value,
-                                   Header.EFFECTIVE_LENGTH.value, Header.TPM.value,
-                                   Header.NUM_READS.value],
-                            usecols=[0, 1, 2, 3, 4])
-        except errors.InvalidIndexError:
-            raise
+    def __set_condition_statistics(self):
+        self.conditions = self.samples[[Header.SAMPLE.value, Header.SAMPLE2.value]].drop_duplicates() \
+            .sort_values(by=[Header.SAMPLE.value, Header.SAMPLE2.value]).reset_index(drop=True)
+        rows = self.transcript_table[Header.ROW.value].to_numpy()
+        self.mean = np.full((len(rows), len(self.conditions)), np.nan)
+        self.standard_deviation = np.full((len(rows), len(self.conditions)), np.nan)
+        for pos, (sample, sample2) in enumerate(zip(self.conditions[Header.SAMPLE.value],
+                                                    self.conditions[Header.SAMPLE2.value])):
+            columns = np.flatnonzero((self.samples[Header.SAMPLE.value] == sample).to_numpy() &
+                                     (self.samples[Header.SAMPLE2.value] == sample2).to_numpy())
+            # Only the replicates of one condition are copied out of the mapped float32 matrix at a time,
+            # the sums are accumulated in float64
+            replicates = self.expression_matrix[np.ix_(rows, columns)]
+            count = np.sum(~np.isnan(replicates), axis=1)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                mean = np.nansum(replicates, axis=1, dtype=np.float64) / count
+                squares = np.nansum((replicates - mean[:, None]) ** 2, axis=1)
+                # Sample standard deviation like pandas, undefined for less than two replicates
+                self.standard_deviation[:, pos] = np.where(count > 1, np.sqrt(squares / (count - 1)), np.nan)
+            self.mean[:, pos] = mean
 
-    @staticmethod
-    def __get_transcript_plot(transcript_table: [DataFrame]) -> go.Figure:
+    def __get_transcript_plot(self, start: int, stop: int) -> go.Figure:
         fig = go.Figure()
         first_or_next = True
-        for name, group_sample in transcript_table.groupby(by=[Header.GENE_ID.value, Header.SAMPLE.value]):
-            sample = name[1]
+        transcripts = self.transcript_table[Header.TRANSCRIPT_ID.value].to_numpy()[start:stop]
+        for sample, group_sample in self.conditions.groupby(by=Header.SAMPLE.value, sort=True):
+            positions = group_sample.index.to_numpy()
+            x_axis = [sample + '_' + sample2 for sample2 in group_sample[Header.SAMPLE2.value]]
             pos = 1
-            for transcript_name, group_transcript in group_sample.groupby(by=[Header.TRANSCRIPT_ID.value]):
-                x_axis = []
-                table_for_calculation = group_transcript.groupby(by=[Header.SAMPLE2.value])
-                y_axis = list(table_for_calculation[Header.TPM.value].mean())
-                standard_deviation = list(table_for_calculation[Header.TPM.value].std())
-                for sample2, grp in table_for_calculation:
-                    key = sample + '_' + sample2
-                    x_axis.append(key)
+            for row, transcript_name in enumerate(transcripts, start=start):
+                y_axis = self.mean[row, positions]
+                if np.isnan(y_axis).all():
+                    continue  # The transcript was not quantified in this sample
+                standard_deviation = self.standard_deviation[row, positions]
                 fig.add_trace(go.Scatter(x=x_axis, y=y_axis, name=transcript_name,
                                          legendrank=pos,
                                          error_y=dict(type='data',
@@ -134,13 +131,10 @@ class Expression:
                                          showlegend=first_or_next,
                                          legendgroup=pos,
                                          # Safe color is used for red green weakness
-                                         marker=dict(color=express.colors.qualitative.Safe[pos - 1])))
+                                         marker=dict(color=qualitative.Safe[(pos - 1) % len(qualitative.Safe)])))
                 pos += 1
             first_or_next = False
         return fig
 
     def __get_gen_name(self, gene: str) -> str:
-        df = self.gene_with_start_stop
-        for gen, chrom, start, stop in zip(df.gene_id, df.Chrom, df.Start, df.Stop):
-            if gene == str(chrom) + ':' + str(start) + '-' + str(stop):
-                return gen
+        return self.gene_index.get_gene_by_locus(gene)
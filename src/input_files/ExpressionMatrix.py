@@ -0,0 +1,145 @@
+from concurrent.futures import ThreadPoolExecutor
+from os import replace, fdopen, chmod
+from tempfile import mkstemp
+from pathlib import Path
+from logging import getLogger
+
+import numpy as np
+from pandas import DataFrame, read_csv, concat, errors
+from src.input_files.ColumnHeader import Header
+from src.input_files.AnnotationCache import CACHE_FOLDER
+
+MATRIX_SUFFIX = '.matrix.npy'
+INDEX_SUFFIX = '.matrix.npz'
+
+
+class ExpressionMatrix:
+    """
+    Compiled store of an experiment. All Salmon quant files of the experiment are merged into one
+    transcript x sample TPM matrix (float32), which is saved in a hidden folder next to the experiment file and
+    opened memory-mapped. The folder is hidden, so the directory watcher does not report compiled matrices.
+    The row index (transcripts) and the column index (sample, sample2, replicate) are saved in a separate file.
+
+    :param experiment_path: path of the experiment csv, which lists the quant files
+    :param workers: int (optional) amount of threads, which read the quant files. Default depends on the cpu count.
+    """
+
+    def __init__(self, experiment_path, workers: int or None = None):
+        self.experiment_path = Path(experiment_path)
+        self.workers = workers
+        # The full name, experiments like exp.a.csv and exp.b.csv must not share their matrix
+        cache_dir = self.experiment_path.parent / CACHE_FOLDER
+        self.matrix_path = cache_dir / (self.experiment_path.name + MATRIX_SUFFIX)
+        self.index_path = cache_dir / (self.experiment_path.name + INDEX_SUFFIX)
+        self.logger = getLogger(__name__)
+
+    def is_compiled(self) -> bool:
+        """
+        Return True if the compiled matrix exists and is newer than the experiment file and all its quant files.
+
+        :return: True if the matrix can be opened without compiling
+        :rtype: bool
+        """
+        if not self.matrix_path.is_file() or not self.index_path.is_file():
+            return False
+        compiled = min(self.matrix_path.stat().st_mtime, self.index_path.stat().st_mtime)
+        sources = [self.experiment_path] + [Path(path) for path in self.get_experiment()[Header.QUANT_FILE.value]]
+        return all(source.stat().st_mtime <= compiled for source in sources)
+
+    def get_experiment(self) -> DataFrame:
+        """
+        Return the experiment table. The quant files are returned as absolute paths.
+
+        :return: Table with the columns Sample, Sample2, replicate and quant_file
+        :rtype: pandas.DataFrame
+        """
+        try:
+            experiment = read_csv(self.experiment_path, compression='infer', header=0,
+                                  names=[Header.SAMPLE.value, Header.SAMPLE2.value, Header.REPLICATE.value,
+                                         Header.QUANT_FILE.value], sep=',',
+                                  usecols=[0, 1, 2, 3], dtype=str)
+        except errors.InvalidIndexError:
+            self.logger.error('Column does not match with the names or the amount.')
+            raise
+        experiment[Header.QUANT_FILE.value] = [str(self.experiment_path.parent / quant_file)
+                                               for quant_file in experiment[Header.QUANT_FILE.value]]
+        return experiment
+
+    def compile(self) -> tuple[np.ndarray, np.ndarray, DataFrame]:
+        """
+        Read all quant files of the experiment and save the TPM matrix with its indexes.
+        If the folder of the experiment is not writable, the matrix is only returned.
+
+        :return: TPM matrix, transcript names of the rows and the samples of the columns
+        :rtype: tuple[np.ndarray, np.ndarray, pandas.DataFrame]
+        """
+        experiment = self.get_experiment()
+        # The csv parser of pandas releases the GIL, so the quant files are read in parallel threads
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            quant_tables = list(executor.map(self.__read_quant_file, experiment[Header.QUANT_FILE.value]))
+        # One concat aligns all samples on the transcript names
+        table = concat(quant_tables, axis=1, ignore_index=True)
+        matrix = table.to_numpy(dtype=np.float32)
+        transcripts = np.asarray(table.index, dtype=str)
+        samples = experiment[[Header.SAMPLE.value, Header.SAMPLE2.value, Header.REPLICATE.value]]
+        try:
+            self.matrix_path.parent.mkdir(exist_ok=True)
+            self.__save(self.matrix_path, lambda file: np.save(file, matrix))
+            self.__save(self.index_path, lambda file: np.savez(
+                file,
+                transcripts=transcripts,
+                samples=samples[Header.SAMPLE.value].to_numpy(dtype=str),
+                samples2=samples[Header.SAMPLE2.value].to_numpy(dtype=str),
+                replicates=samples[Header.REPLICATE.value].to_numpy(dtype=str)))
+        except OSError as error:
+            self.logger.warning('Could not save the compiled matrix of %s, it is kept in memory: %s',
+                                self.experiment_path, error)
+        else:
+            self.logger.info('Compiled %s: %d transcripts x %d samples.', self.experiment_path, *matrix.shape)
+        return matrix, transcripts, samples
+
+    def open(self) -> tuple[np.ndarray, np.ndarray, DataFrame]:
+        """
+        Open the compiled matrix. The matrix is compiled first, if it is missing or outdated.
+        A matrix, which could not be saved, is returned in memory.
+
+        :return: TPM matrix (memory-mapped), transcript names of the rows and the samples of the columns
+        :rtype: tuple[np.ndarray, np.ndarray, pandas.DataFrame]
+        """
+        if not self.is_compiled():
+            compiled = self.compile()
+            if not self.is_compiled():
+                return compiled
+        matrix = np.load(self.matrix_path, mmap_mode='r')
+        with np.load(self.index_path, allow_pickle=False) as index:
+            samples = DataFrame({Header.SAMPLE.value: index['samples'],
+                                 Header.SAMPLE2.value: index['samples2'],
+                                 Header.REPLICATE.value: index['replicates']})
+            return matrix, index['transcripts'], samples
+
+    @staticmethod
+    def __read_quant_file(path: str):
+        try:
+            quant = read_csv(path, compression='infer', sep='\t', header=0,
+                             names=[Header.NAME.value, Header.LENGTH.value,
+                                    Header.EFFECTIVE_LENGTH.value, Header.TPM.value,
+                                    Header.NUM_READS.value],
+                             usecols=[0, 3], dtype={Header.NAME.value: str, Header.TPM.value: np.float32})
+        except errors.InvalidIndexError:
+            raise
+        return quant.drop_duplicates(subset=Header.NAME.value).set_index(Header.NAME.value)[Header.TPM.value]
+
+    @staticmethod
+    def __save(path: Path, save):
+        # Write to a temporary file first, so that a running server never opens a half written file.
+        # The name is unique, server workers may compile the same experiment at once.
+        descriptor, tmp_path = mkstemp(dir=path.parent, prefix='.tmp-', suffix=path.suffix)
+        try:
+            with fdopen(descriptor, 'wb') as tmp_file:
+                save(tmp_file)
+            # mkstemp creates the file readable by its owner only
+            chmod(tmp_path, 0o644)
+            replace(tmp_path, path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
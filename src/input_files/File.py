@@ -1,10 +1,13 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
-from pybedtools import BedTool
 from src.input_files.File_type import Filetype
 from src.input_files.Colors import Color
 from logging import getLogger
 
+# Template of the region endpoint, igv.js fills in the visible window
+REGION_FOLDER = 'region/'
+REGION_QUERY = '?locus=$CHR:$START-$END'
+
 
 class FileInput:
     """Decorator for file checking
@@ -20,6 +23,7 @@ class FileInput:
         self.file_path = file_path
         self.file_type = file_type
         self.server_path = server_path
+        self.converted_path = ''
         self.logger = getLogger(__name__)
 
     def get_general_dict(self, colour) -> dict:
@@ -30,6 +34,21 @@ class FileInput:
         """
         if not colour:
             colour = Color.YELLOW_RGB.value
+        if self.converted_path:
+            # The bigWig of a bedGraph is read by igv.js with range requests
+            return dict(name=self.file_name,
+                        url=self.converted_path,
+                        type='wig',
+                        format='bigwig',
+                        color=colour)
+        if self.file_type in [Filetype.BEDGRAPH, Filetype.BED]:
+            # Unindexed tracks are sliced by the server, so only the visible window is transferred
+            return dict(name=self.file_name,
+                        type='wig' if self.file_type == Filetype.BEDGRAPH else 'annotation',
+                        sourceType='custom',
+                        source=dict(url=REGION_FOLDER + self.file_name + REGION_QUERY),
+                        nameField='gene',
+                        color=colour)
         return dict(name=self.file_name,
                     url=self.server_path,
                     nameField='gene',
@@ -37,7 +56,8 @@ class FileInput:
 
     def get_genes_for_annotation(self) -> list[str]:
         if self.file_type in [Filetype.BED, Filetype.GTF, Filetype.GFF, Filetype.GFF, Filetype.GFF]:
-            print([str(entry.name) for entry in BedTool(self.file_path)])
+            # Imported on use, pybedtools is only needed here
+            from pybedtools import BedTool
             return [str(entry.name) for entry in BedTool(self.file_path)]
         return None
 
@@ -50,6 +70,7 @@ class FileInput:
         :rtype: list[str]
         """
         if gen is not None:
+            from pybedtools import BedTool
             locus = [str(entry.chrom) + ':' + str(entry.start) + '-' + str(entry.stop) for entry in
                      BedTool(self.file_path)
                      if (str(entry.start) + ':' + str(entry.stop)) == gen]
@@ -85,6 +106,23 @@ class FileInput:
         """
         return self.server_path
 
+    def set_converted_path(self, server_path: str):
+        """
+        Set the server path of an indexed copy of the file, e.g. the bigWig of a bedGraph.
+
+        :param server_path: str server location of the converted file
+        """
+        self.converted_path = server_path
+
+    def get_converted_path(self) -> str:
+        """
+        Return the server path of the indexed copy of the file or an empty string, if there is none.
+
+        :return: server path of the converted file
+        :rtype: str
+        """
+        return self.converted_path
+
     def get_filepath(self) -> str:
         """
         Return the path of the file on the local drive.
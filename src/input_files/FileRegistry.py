@@ -0,0 +1,101 @@
+from itertools import count
+from threading import RLock
+
+from src.input_files.File import FileInput
+from src.input_files.File_type import Filetype
+
+
+class FileRegistry:
+    """
+    Registry of all input files with lookups by filename and by filetype. Listings are computed once
+    and kept until a file is added or removed, so callbacks do not scan or sort the files on every call.
+    """
+
+    def __init__(self):
+        self.files_by_name = dict()
+        self.files_by_type = {file_type: dict() for file_type in Filetype}
+        self.order = dict()
+        self.listings = dict()
+        self.sequence = count()
+        self.lock = RLock()
+
+    def __len__(self) -> int:
+        return len(self.files_by_name)
+
+    def __contains__(self, filename: str) -> bool:
+        return filename in self.files_by_name
+
+    def __iter__(self):
+        return iter(self.get_files())
+
+    def add(self, file: FileInput):
+        """
+        Add a file. A file with the same name is replaced.
+
+        :param file: FileInput to register
+        """
+        with self.lock:
+            self.remove(file.get_filename())
+            self.files_by_name[file.get_filename()] = file
+            self.files_by_type[file.get_filetype()][file.get_filename()] = file
+            self.order[file.get_filename()] = next(self.sequence)
+            self.listings.clear()
+
+    def remove(self, filename: str) -> FileInput or None:
+        """
+        Remove a file.
+
+        :param filename: str name of the file
+        :return: the removed file or None, if it was not registered
+        :rtype: FileInput or None
+        """
+        with self.lock:
+            file = self.files_by_name.pop(filename, None)
+            if file is not None:
+                self.files_by_type[file.get_filetype()].pop(filename, None)
+                self.order.pop(filename, None)
+                self.listings.clear()
+            return file
+
+    def get(self, filename: str) -> FileInput or None:
+        """
+        Return a file by its name.
+
+        :param filename: str name of the file
+        :return: the file or None, if it is not registered
+        :rtype: FileInput or None
+        """
+        return self.files_by_name.get(filename)
+
+    def get_files(self, *file_types: Filetype) -> list[FileInput]:
+        """
+        Return the files of the given types in the order they were added. Without types all files are returned.
+
+        :param file_types: Filetype of the wanted files
+        :return: files
+        :rtype: list[FileInput]
+        """
+        with self.lock:
+            key = ('files', file_types)
+            if key not in self.listings:
+                if file_types:
+                    files = [file for file_type in set(file_types) for file in self.files_by_type[file_type].values()]
+                    files.sort(key=lambda file: self.order[file.get_filename()])
+                else:
+                    files = list(self.files_by_name.values())
+                self.listings[key] = files
+            return list(self.listings[key])
+
+    def get_names(self, *file_types: Filetype) -> list[str]:
+        """
+        Return the sorted names of the files of the given types.
+
+        :param file_types: Filetype of the wanted files
+        :return: sorted filenames
+        :rtype: list[str]
+        """
+        with self.lock:
+            key = ('names', file_types)
+            if key not in self.listings:
+                self.listings[key] = sorted(file.get_filename() for file in self.get_files(*file_types))
+            return list(self.listings[key])
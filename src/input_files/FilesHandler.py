@@ -1,16 +1,30 @@
-from os import listdir
-from os.path import isfile, join
-from collections import deque
+from pathlib import Path
+from concurrent.futures import Future, wait
+from time import perf_counter
+from logging import getLogger
 
 from plotly import graph_objects as go
 
 from src.input_files.File_type import Filetype
 from src.input_files.File import FileInput
 from src.input_files.FileHandlerInterface import FileHandlerInterface
+from src.input_files.FileRegistry import FileRegistry
+from src.input_files.DirectoryScanner import DirectoryScanner, QUANT_SUFFIXES
+from src.input_files.DirectoryWatcher import DirectoryWatcher
 from src.input_files.AnnotationFile import Annotation
 from src.input_files.ExpressionFile import Expression
+from src.input_files.ExpressionMatrix import ExpressionMatrix
+from src.input_files.RegionIndex import RegionIndex
+from src.input_files.CoverageConverter import CoverageConverter
+from src.input_files.DatasetLoader import DatasetLoader
 from src.input_files.ARGS import Args
-import re
+
+# Key of the annotation in the dataset loader, experiments and tracks are keyed by their filename
+ANNOTATION = 'annotation'
+EXPRESSION = 'expression'
+TRACK = 'track'
+# Seconds a request waits for a dataset, which is still loading
+LOAD_TIMEOUT = 5.0
 
 
 class FileHandler(FileHandlerInterface):
@@ -22,11 +36,19 @@ class FileHandler(FileHandlerInterface):
 
     def __init__(self, args: Args):
         self.SERVER_FOLDER = 'tracks/'
-        self.all_files = deque()
+        self.all_files = FileRegistry()
         self.args = args
-        self.anno_file = Annotation()
-        self.expression_file = Expression()
+        self.anno_file = Annotation(args.get_cache_directory())
+        self.loader = DatasetLoader(args.get_load_workers())
+        self.region_index = RegionIndex()
+        self.coverage_converter = CoverageConverter()
+        # Otherwise bedGraph files are answered by the region endpoint with its zoom summaries
+        self.convert_bedgraph = args.get_coverage_mode() == 'bigwig'
+        self.scanner = DirectoryScanner(args.get_load_workers())
+        self.watcher = None
+        self.listeners = []
         self.path_of_files = args.get_absolut_path('dir')
+        self.logger = getLogger(__name__)
         self.load_all_files(args.get_directory())
 
     def get_genome(self, filename: str) -> list[FileInput]:
@@ -38,14 +60,8 @@ class FileHandler(FileHandlerInterface):
         :rtype: list[FileInput]
         """
         if not filename:
-            return [genome for genome in self.all_files
-                    if genome.get_filetype() == Filetype.FASTA]
-        genome = []
-        for name in filename:
-            for file in self.all_files:
-                if file.get_filename() == name:
-                    genome.append(file)
-        return genome
+            return self.all_files.get_files(Filetype.FASTA)
+        return [self.all_files.get(name) for name in filename if name in self.all_files]
 
     def get_specific_files_as_dict(self, filename: list[str], color: str) -> list[dict]:
         """
@@ -58,15 +74,14 @@ class FileHandler(FileHandlerInterface):
         specific_files = []
         if not filename:
             # This option is only if the user starts the app without specifying, which file to display
-            return [sequence_file.get_general_dict(color) for sequence_file in self.all_files if
-                    sequence_file.get_filetype() in [Filetype.BAM,
-                                                     Filetype.BEDGRAPH,
-                                                     # File_type.Filetype.WIG, future release
-                                                     Filetype.bigWIG]]
+            return [sequence_file.get_general_dict(color) for sequence_file in
+                    self.all_files.get_files(Filetype.BAM,
+                                             Filetype.BEDGRAPH,
+                                             # File_type.Filetype.WIG, future release
+                                             Filetype.bigWIG)]
         for name in filename:
-            for specif_file in self.all_files:
-                if specif_file.get_filename() == name:
-                    specific_files.append(specif_file.get_general_dict(color))
+            if name in self.all_files:
+                specific_files.append(self.all_files.get(name).get_general_dict(color))
         if len(specific_files) == 0:
             raise FileNotFoundError
         return specific_files
@@ -80,13 +95,9 @@ class FileHandler(FileHandlerInterface):
         :rtype: FileInput
         """
         if file is not None:
-            for entry in self.all_files:
-                if isinstance(file, list):
-                    for name in file:
-                        if entry.get_filename() == name:
-                            return entry
-                elif entry.get_filename() == file:
-                    return entry
+            for name in (file if isinstance(file, list) else [file]):
+                if name in self.all_files:
+                    return self.all_files.get(name)
             raise FileNotFoundError
         raise NameError('The field file is empty.')
 
@@ -108,6 +119,26 @@ class FileHandler(FileHandlerInterface):
             return None
         return self.anno_file.get_dropdown_menu()
 
+    def search_genes(self, query: str, limit: int, value: str or None) -> list[dict]:
+        """
+        Return the dropdown entries of the genes, which match the query.
+
+        :param query: str search value of the dropdown
+        :param limit: int maximum amount of matches
+        :param value: str (optional) selected value, which is always part of the result
+        :return: list of dicts for the dropdown menu
+        :rtype: list[dict]
+        :raise: TimeoutError if the annotation is still loading
+        """
+        self.__wait_for_annotation(LOAD_TIMEOUT)
+        if self.anno_file.is_empty():
+            return []
+        options = self.anno_file.search_dropdown(query, limit)
+        selected = self.anno_file.get_dropdown_option(value) if value else None
+        if selected is not None and selected not in options:
+            options.append(selected)
+        return options
+
     def get_annotations(self) -> list[str]:
         """
         Returns a list of possible annotation input_files.
@@ -115,9 +146,8 @@ class FileHandler(FileHandlerInterface):
         :return: Files like GTF, BED12 as a list
         :rtype: list[str]
         """
-        return sorted([file.get_filename() for file in self.all_files if
-                       file.get_filetype() in [Filetype.GTF,
-                                               Filetype.BED]])
+        return self.all_files.get_names(Filetype.GTF,
+                                        Filetype.BED)
 
     def get_coverage_files(self) -> list[str]:
         """
@@ -126,11 +156,10 @@ class FileHandler(FileHandlerInterface):
         :return: Files like BAM, BED4(BedGraph), BED6, WIG, bigWIG
         :rtype: list[str]
         """
-        return sorted([sequence_file.get_filename() for sequence_file in self.all_files if
-                       sequence_file.get_filetype() in [Filetype.BAM,
-                                                        Filetype.BEDGRAPH,
-                                                        # File_type.Filetype.WIG, future release
-                                                        Filetype.bigWIG]])
+        return self.all_files.get_names(Filetype.BAM,
+                                        Filetype.BEDGRAPH,
+                                        # File_type.Filetype.WIG, future release
+                                        Filetype.bigWIG)
 
     def get_genome_files(self) -> list[str]:
         """
@@ -139,8 +168,7 @@ class FileHandler(FileHandlerInterface):
         :return: Files like FA, FAS
         :rtype: list[str]
         """
-        return sorted([genome.get_filename() for genome in self.all_files if
-                       genome.get_filetype() is Filetype.FASTA])
+        return self.all_files.get_names(Filetype.FASTA)
 
     def get_expressions(self) -> list[str]:
         """
@@ -149,8 +177,7 @@ class FileHandler(FileHandlerInterface):
         :return: CSV-input_files
         :rtype: list[str]
         """
-        return sorted([expression.get_filename() for expression in self.all_files if
-                       expression.get_filetype() is Filetype.SF])
+        return self.all_files.get_names(Filetype.SF)
 
     def get_descriptions(self) -> list[str]:
         """
@@ -159,8 +186,7 @@ class FileHandler(FileHandlerInterface):
         :return: CSV-input_files
         :rtype: list[str]
         """
-        return sorted([expression.get_filename() for expression in self.all_files if
-                       expression.get_filetype() is Filetype.CSV])
+        return self.all_files.get_names(Filetype.CSV)
 
     def get_expression_figure(self, file: FileInput, gene: str) -> go.Figure:
         """
@@ -170,15 +196,99 @@ class FileHandler(FileHandlerInterface):
         :param gene: takes the range of a gene on the chromosome
         :return: graph
         :rtype: go.Figure
-        :raise: NameError if there exist no annotation file
+        :raise: NameError if there exist no annotation file, TimeoutError if the experiment is still loading
         """
-        if self.expression_file.is_empty():
-            if not self.anno_file.is_empty():
-                self.expression_file.create_expression_file(file, self.anno_file.get_transcript_to_gene(),
-                                                            self.anno_file.get_genes_with_start_and_stops())
-            else:
-                raise NameError('Annotation file is missing!')
-        return self.expression_file.get_expression_figure(gene)
+        return self.load_expression(file).get_expression_figure(gene)
+
+    def load_expression(self, file: FileInput, timeout: float or None = LOAD_TIMEOUT) -> Expression:
+        """
+        Return the loaded experiment and load it in the background, if it is not loaded yet. Each experiment is
+        loaded once and kept, so sessions with different experiments do not replace each other's data.
+
+        :param file: take a FileInput with Filetype.SF
+        :param timeout: float (optional) seconds to wait for the experiment, None waits until it is loaded
+        :return: loaded experiment
+        :rtype: Expression
+        :raise: NameError if there exist no annotation file, TimeoutError if the experiment is still loading
+        """
+        return self.loader.result(self.preload_expression(file), timeout)
+
+    def preload_expression(self, file: FileInput) -> Future:
+        """
+        Start loading an experiment in the background, if it is neither loaded nor being loaded.
+        Requests for the experiment share this load.
+
+        :param file: take a FileInput with Filetype.SF
+        :return: Future of the experiment
+        :rtype: Future
+        """
+        return self.loader.submit((EXPRESSION, file.get_filename()), file.get_filename(), self.__load_expression, file)
+
+    def load_expressions(self):
+        """
+        Start loading all experiments in the background.
+        """
+        if self.anno_file.is_empty() and not self.loader.is_loading(ANNOTATION):
+            return
+        for name in self.get_expressions():
+            self.preload_expression(self.get_specific_file(name))
+
+    def wait_for_datasets(self):
+        """
+        Block until the annotation, the experiments and the tracks, which are loading in the background,
+        are loaded, e.g. before the server forks its workers, which then share them.
+        """
+        self.loader.wait()
+
+    def get_loading_status(self) -> dict:
+        """
+        Return the progress of the datasets, which are loaded in the background.
+
+        :doc: input_files.DatasetLoader.DatasetLoader.get_status
+        """
+        return self.loader.get_status()
+
+    def __load_expression(self, file: FileInput) -> Expression:
+        self.__wait_for_annotation(None)
+        if self.anno_file.is_empty():
+            raise NameError('Annotation file is missing!')
+        expression_file = Expression(self.args.get_load_workers())
+        expression_file.create_expression_file(file, self.anno_file.get_transcript_to_gene(),
+                                               self.anno_file.get_gene_index())
+        expression_file.prepare_figures()
+        return expression_file
+
+    def __load_annotation(self, files: list[FileInput]) -> Annotation:
+        annotation = Annotation(self.args.get_cache_directory())
+        annotation.create_dict_for_annotation(files)
+        # Replaced at once, so requests never see a partly loaded annotation
+        self.anno_file = annotation
+        return annotation
+
+    def __wait_for_annotation(self, timeout: float or None):
+        # A failed load leaves the annotation empty, like a missing annotation
+        future = self.loader.get_future(ANNOTATION)
+        if future is not None and not wait([future], timeout=timeout).done:
+            raise TimeoutError('The annotation is still loading.')
+
+    def get_region(self, filename: str, locus: str) -> list[dict]:
+        """
+        Return the features of a bedGraph or BED track, which overlap a region.
+
+        :param filename: str filename of an existing bedGraph or BED file
+        :param locus: str region like chr1:1000-2000
+        :return: features for the igv-component
+        :rtype: list[dict]
+        :raise: FileNotFoundError if the file does not exist, ValueError if the locus is malformed
+        """
+        return self.region_index.query(self.get_specific_file(filename), locus)
+
+    def compile_expressions(self):
+        """
+        Compile all experiment files into TPM matrices, which are opened instead of the quant files.
+        """
+        for name in self.get_expressions():
+            ExpressionMatrix(self.get_specific_file(name).get_filepath(), self.args.get_load_workers()).compile()
 
     def is_dict_set(self) -> bool:
         """
@@ -187,77 +297,131 @@ class FileHandler(FileHandlerInterface):
         :return: True or False
         :rtype: bool
         """
-        return self.anno_file.is_empty()
+        return self.anno_file.is_empty() and not self.loader.is_loading(ANNOTATION)
 
     def load_all_files(self, path: str):
         """
-        Load all Files into the FilesHandler.
+        Load all Files into the FilesHandler. The directory is scanned recursively, files in subdirectories are
+        named by their path relative to the directory.
 
         :param path: need a path to the directory/File
         :raises PermissionError: If the directory is not accessible
         """
+        start_time = perf_counter()
         if self.args.has_option('dir'):
-            only_files = [f for f in listdir(path) if isfile(join(path, f))]
+            only_files = self.scanner.scan(path)
         else:
-            only_files = self.args.get_files()
+            only_files = [(file, self.scanner.get_filetype(str(self.path_of_files) + '/' + file))
+                          for file in self.args.get_files()]
         if self.args.has_option('anno'):
             anno_dict_path = self.args.get_annotation_directory()
             file_path = str(self.args.get_absolut_path('anno')) + '/'
-            anno_files = [FileInput(f, file_path + f, self.__get_filetype(f)) for f in listdir(anno_dict_path) if
-                          isfile(join(anno_dict_path, f))]
-            if len(anno_files) < 4:
-                self.anno_file.create_dict_for_annotation(anno_files)
+            anno_entries = self.scanner.scan(anno_dict_path, recursive=False)
+            if len(anno_entries) < 4:
+                self.loader.submit(ANNOTATION, 'annotation', self.__load_annotation,
+                                   [FileInput(f, file_path + f, file_type) for f, file_type in anno_entries])
             else:
-                anno_files = [f for f in listdir(anno_dict_path) if isfile(join(anno_dict_path, f))]
-                only_files = only_files + anno_files
-        for file in only_files:
-            file_name = self.__remove_zone_identifier(file.__str__())
+                only_files = only_files + anno_entries
+        for file_name, file_type in only_files:
             file_path = str(self.path_of_files) + '/' + file_name
-            file_type = self.__get_filetype(file_path)
-
-            # Check if Filetype was found and ignores zipped files
-            if file_type != Filetype.NONE and file.find('.gz') == -1:
+            if file_type != Filetype.NONE:
                 the_file = FileInput(file_name, file_path, file_type,
                                      self.SERVER_FOLDER + file_name)
-                self.all_files.append(the_file)
-
-    def __get_filetype(self, file: str) -> Filetype:
-        file_type = Filetype.NONE
-        if re.search(r'\b.fa\b', file) or re.search(r'\b.fas\b', file):
-            file_type = Filetype.FASTA
-        if re.search(r'\b.fai\b', file):
-            file_type = Filetype.FASTAINDEX
-        if re.search(r"\b.bed\b", file):  # explicit search for .bed.
-            # Be aware of input_files with index like .bed.gz.tbi
-            file_type = Filetype.BED
-        if file.find('.bedgraph') != -1:
-            file_type = Filetype.BEDGRAPH
-        if file.find('.gtf') != -1:
-            file_type = Filetype.GTF
-        if file.find('.gff') != -1:
-            file_type = Filetype.GFF
-        if file.find('bam') != -1:
-            file_type = Filetype.BAM
-        if file.find('wig') != -1:
-            file_type = Filetype.WIG
-        if file.find('bw') != -1:
-            file_type = Filetype.bigWIG
-        if file.find('csv') != -1:
-            file_type = self.__check_csv(file)
-        if file.find('tsv') != -1:
-            file_type = Filetype.TSV
-        return file_type
-
-    @staticmethod
-    def __check_csv(file: str) -> Filetype:
-        if file.find('index') != -1:
-            return Filetype.CSV
-        if file.find('description') != -1:
-            return Filetype.CSV
-        if file.find('experiment') != -1:
-            return Filetype.SF
-        return Filetype.NONE
-
-    @staticmethod
-    def __remove_zone_identifier(file: str) -> str:
-        return file.replace(':Zone.Identifier', '')
+                self.all_files.add(the_file)
+        self.logger.info('Found %d files in %.2f s.', len(self.all_files), perf_counter() - start_time)
+        self.__prepare_tracks(self.all_files.get_files(Filetype.BEDGRAPH, Filetype.BED))
+
+    def watch(self):
+        """
+        Start watching the data directory, if it is given and watching is not disabled.
+        Added, changed and removed files are updated one by one, without loading the other files again.
+        """
+        interval = self.args.get_watch_interval()
+        if self.watcher is None and interval > 0 and self.args.has_option('dir'):
+            self.watcher = DirectoryWatcher(self.path_of_files, self.scanner, interval, self.update_files)
+            self.watcher.start()
+
+    def add_listener(self, listener):
+        """
+        Register a callable, which is called with the names of the added, changed and removed files.
+
+        :param listener: callable, which takes a list of filenames
+        """
+        self.listeners.append(listener)
+
+    def update_files(self, changed: list[str], removed: list[str]):
+        """
+        Update the registry and the derived data of the given files only.
+
+        :param changed: list[str] names of added or changed files relative to the data directory
+        :param removed: list[str] names of removed files
+        """
+        for file_name in removed:
+            self.__forget(self.all_files.remove(file_name))
+        added = []
+        for file_name in changed:
+            self.__forget(self.all_files.remove(file_name))
+            file_path = str(self.path_of_files) + '/' + file_name
+            file_type = self.scanner.get_filetype(file_path)
+            if file_type != Filetype.NONE:
+                the_file = FileInput(file_name, file_path, file_type, self.SERVER_FOLDER + file_name)
+                self.all_files.add(the_file)
+                added.append(the_file)
+        for file_name in changed + removed:
+            if file_name.lower().endswith(QUANT_SUFFIXES):
+                self.__unload_expressions_of_quant_file(file_name)
+        self.__prepare_tracks([file for file in added if file.get_filetype() in [Filetype.BEDGRAPH, Filetype.BED]])
+        for listener in self.listeners:
+            listener(changed + removed)
+
+    def __forget(self, file: FileInput or None):
+        if file is None:
+            return
+        self.region_index.invalidate(file.get_filename())
+        self.loader.forget((TRACK, file.get_filename()))
+        # The experiment is loaded again on the next figure, a changed matrix is compiled again
+        self.loader.forget((EXPRESSION, file.get_filename()))
+
+    def __unload_expressions_of_quant_file(self, file_name: str):
+        # Quant files are listed relative to the experiment file, usually in its folder or below
+        for name in self.get_expressions():
+            if Path(name).parent in Path(file_name).parents:
+                self.loader.forget((EXPRESSION, name))
+
+    def __prepare_tracks(self, files: list[FileInput]):
+        if self.convert_bedgraph and not self.coverage_converter.is_available() and \
+                any(file.get_filetype() == Filetype.BEDGRAPH for file in files):
+            self.logger.warning('pyBigWig is not installed, bedGraph files are not converted.')
+        for file in files:
+            self.loader.submit((TRACK, file.get_filename()), file.get_filename(), self.__prepare_track, file)
+
+    def __prepare_track(self, file: FileInput) -> FileInput:
+        if file.get_filetype() == Filetype.BEDGRAPH and self.convert_bedgraph and \
+                self.coverage_converter.is_available():
+            self.convert_coverage_files([file])
+        # Tracks, which igv.js can not read as bigWig, are indexed and summarized ahead of the first request.
+        # The zoom summaries of a bedGraph are used with -coverage zoom, without pyBigWig or if the conversion failed.
+        if not file.get_converted_path():
+            self.region_index.get_index(file)
+        return file
+
+    def convert_coverage_files(self, files: list[FileInput] or None = None):
+        """
+        Convert bedGraph files into bigWig, so that igv.js reads only the visible region.
+        Files, which could not be converted, are answered by the region endpoint.
+
+        :param files: FileInput with Filetype.BEDGRAPH (optional), by default all bedGraph files
+        """
+        if files is None:
+            files = self.all_files.get_files(Filetype.BEDGRAPH)
+        if not files:
+            return
+        if not self.coverage_converter.is_available():
+            self.logger.warning('pyBigWig is not installed, bedGraph files are not converted.')
+            return
+        for file in files:
+            converted = self.coverage_converter.convert(file.get_filepath())
+            if converted is not None and Path(self.path_of_files) in converted.parents:
+                # Only files below the data folder are reachable through the track server
+                relative = converted.relative_to(Path(self.path_of_files)).as_posix()
+                file.set_converted_path(self.SERVER_FOLDER + relative)
@@ -0,0 +1,76 @@
+from pandas import DataFrame
+from src.input_files.ColumnHeader import Header
+
+
+class GeneIndex:
+    """
+    Hash index over the gene table of an annotation. Maps a locus (CHROMOSOME:START-STOP) and a gene_id
+    to the row position of the gene, so a gene selected in the dropdown is resolved in constant time.
+
+    :param gene_with_start_stop: DataFrame with the columns gene_id, Chrom, Start and Stop
+    """
+
+    def __init__(self, gene_with_start_stop: DataFrame = DataFrame()):
+        self.gene_ids = []
+        self.loci = []
+        self.row_by_locus = dict()
+        self.row_by_gene = dict()
+        if not gene_with_start_stop.empty:
+            self.gene_ids = gene_with_start_stop[Header.GENE_ID.value].astype(str).tolist()
+            self.loci = (gene_with_start_stop[Header.CHROM.value].astype(str) + ':' +
+                         gene_with_start_stop[Header.START.value].astype(str) + '-' +
+                         gene_with_start_stop[Header.STOP.value].astype(str)).tolist()
+            # Reversed, so that the first gene wins if two genes share a locus
+            self.row_by_locus = {locus: row for row, locus in reversed(list(enumerate(self.loci)))}
+            self.row_by_gene = {gene: row for row, gene in enumerate(self.gene_ids)}
+
+    def is_empty(self) -> bool:
+        """
+        Return True if the index contains no genes.
+
+        :return: True if empty
+        :rtype: bool
+        """
+        return len(self.gene_ids) == 0
+
+    def get_loci(self) -> list[str]:
+        """
+        Return the loci of all genes in the order of the gene table.
+
+        :return: loci like CHROMOSOME:START-STOP
+        :rtype: list[str]
+        """
+        return self.loci
+
+    def get_row_by_locus(self, locus: str) -> int or None:
+        """
+        Return the row position of the gene at the given locus.
+
+        :param locus: str like CHROMOSOME:START-STOP
+        :return: row position or None if the locus is unknown
+        :rtype: int or None
+        """
+        return self.row_by_locus.get(locus)
+
+    def get_row_by_gene(self, gene_id: str) -> int or None:
+        """
+        Return the row position of a gene.
+
+        :param gene_id: str id of the gene
+        :return: row position or None if the gene is unknown
+        :rtype: int or None
+        """
+        return self.row_by_gene.get(gene_id)
+
+    def get_gene_by_locus(self, locus: str) -> str or None:
+        """
+        Return the gene_id of the gene at the given locus.
+
+        :param locus: str like CHROMOSOME:START-STOP
+        :return: gene_id or None if the locus is unknown
+        :rtype: str or None
+        """
+        row = self.row_by_locus.get(locus)
+        if row is None:
+            return None
+        return self.gene_ids[row]
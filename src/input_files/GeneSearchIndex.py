@@ -0,0 +1,141 @@
+import numpy as np
+from pandas import DataFrame
+from src.input_files.ColumnHeader import Header
+
+# Upper bound for a prefix range in the sorted key arrays
+MAX_CHARACTER = '\U0010ffff'
+# Amount of candidates of the shortest trigram posting list, which are intersected at once
+CHUNK_SIZE = 256
+
+
+class GeneSearchIndex:
+    """
+    In-memory search index over gene ids, gene names and descriptions. Prefixes of ids and names are looked up
+    by binary search in sorted arrays, substrings in any field by trigram posting lists.
+    A search returns row positions of the gene table, ranked by:
+    exact id or name, id prefix, name prefix and finally substring anywhere.
+
+    :param genes: DataFrame with the column gene_id and optional external_gene_name and description,
+        one row per gene in the order of the gene table
+    """
+
+    def __init__(self, genes: DataFrame = DataFrame()):
+        self.texts = []
+        self.id_keys, self.id_rows = self.__get_sorted_keys(genes, Header.GENE_ID.value)
+        self.name_keys, self.name_rows = self.__get_sorted_keys(genes, Header.EXTERNAL_GENE_NAME.value)
+        if not genes.empty:
+            fields = [Header.GENE_ID.value, Header.EXTERNAL_GENE_NAME.value, Header.DESCRIPTION.value]
+            columns = [genes[field].astype(object).fillna('').astype(str).str.lower()
+                       for field in fields if field in genes.columns]
+            texts = columns[0]
+            for column in columns[1:]:
+                texts = texts + '\t' + column
+            self.texts = texts.tolist()
+        self.trigrams, self.trigram_rows = self.__get_trigram_postings(self.texts)
+
+    def search(self, query: str, limit: int) -> list[int]:
+        """
+        Return the rows of the genes, which match the query.
+
+        :param query: str part of a gene id, name or description, case-insensitive
+        :param limit: int maximum amount of rows
+        :return: row positions, best match first
+        :rtype: list[int]
+        """
+        query = query.strip().lower()
+        if not query or limit <= 0:
+            return []
+        rows = []
+        found = set()
+        for candidates in (self.__get_exact(query), self.__get_prefix(self.id_keys, self.id_rows, query, limit),
+                           self.__get_prefix(self.name_keys, self.name_rows, query, limit)):
+            for row in candidates:
+                if row not in found:
+                    found.add(row)
+                    rows.append(row)
+                    if len(rows) == limit:
+                        return rows
+        for row in self.__get_substring(query):
+            if row not in found and query in self.texts[row]:
+                found.add(row)
+                rows.append(row)
+                if len(rows) == limit:
+                    break
+        return rows
+
+    def __get_exact(self, query: str) -> list[int]:
+        exact = []
+        for keys, key_rows in ((self.id_keys, self.id_rows), (self.name_keys, self.name_rows)):
+            if len(query) <= self.__get_key_width(keys):
+                low = np.searchsorted(keys, query, side='left')
+                high = np.searchsorted(keys, query, side='right')
+                exact.extend(int(row) for row in np.sort(key_rows[low:high]))
+        return exact
+
+    @staticmethod
+    def __get_prefix(keys: np.ndarray, key_rows: np.ndarray, query: str, limit: int) -> list[int]:
+        # A search key longer than the array items would make numpy copy the whole array to a wider dtype
+        width = GeneSearchIndex.__get_key_width(keys)
+        if len(query) > width:
+            return []
+        low = np.searchsorted(keys, query, side='left')
+        if len(query) == width:
+            high = np.searchsorted(keys, query, side='right')
+        else:
+            high = np.searchsorted(keys, query + MAX_CHARACTER, side='left')
+        rows = key_rows[low:high]
+        if len(rows) > limit:
+            rows = np.partition(rows, limit - 1)[:limit]
+        return np.sort(rows).tolist()
+
+    @staticmethod
+    def __get_key_width(keys: np.ndarray) -> int:
+        return keys.dtype.itemsize // np.dtype('U1').itemsize
+
+    def __get_substring(self, query: str):
+        codes = self.__get_trigram_codes(query)
+        if len(codes) == 0:
+            # Queries shorter than a trigram are only answered by prefixes
+            return
+        low = np.searchsorted(self.trigrams, codes, side='left')
+        high = np.searchsorted(self.trigrams, codes, side='right')
+        postings = sorted((self.trigram_rows[start:stop] for start, stop in zip(low, high)), key=len)
+        if len(postings[0]) == 0:
+            return
+        # The shortest posting list is walked in chunks, so a search stops early once enough genes were found
+        for start in range(0, len(postings[0]), CHUNK_SIZE):
+            candidates = postings[0][start:start + CHUNK_SIZE]
+            for posting in postings[1:]:
+                positions = np.minimum(np.searchsorted(posting, candidates), len(posting) - 1)
+                candidates = candidates[posting[positions] == candidates]
+            yield from candidates.tolist()
+
+    @staticmethod
+    def __get_sorted_keys(genes: DataFrame, field: str) -> tuple[np.ndarray, np.ndarray]:
+        if genes.empty or field not in genes.columns:
+            return np.empty(0, dtype=str), np.empty(0, dtype=np.int32)
+        keys = genes[field].astype(object).fillna('').astype(str).str.lower().to_numpy(dtype=str)
+        order = np.argsort(keys, kind='stable').astype(np.int32)
+        return keys[order], order
+
+    @staticmethod
+    def __get_trigram_codes(text: str) -> np.ndarray:
+        data = np.frombuffer(text.encode(), dtype=np.uint8).astype(np.uint32)
+        if len(data) < 3:
+            return np.empty(0, dtype=np.uint32)
+        return np.unique(data[:-2] << 16 | data[1:-1] << 8 | data[2:])
+
+    @staticmethod
+    def __get_trigram_postings(texts: list[str]) -> tuple[np.ndarray, np.ndarray]:
+        if not texts:
+            return np.empty(0, dtype=np.uint32), np.empty(0, dtype=np.int32)
+        # All texts are concatenated with a zero byte, trigrams over a separator are dropped
+        encoded = [text.encode() for text in texts]
+        lengths = np.array([len(text) + 1 for text in encoded], dtype=np.int64)
+        data = np.frombuffer(b'\0'.join(encoded) + b'\0', dtype=np.uint8).astype(np.uint32)
+        rows = np.repeat(np.arange(len(texts), dtype=np.int64), lengths)
+        codes = data[:-2] << 16 | data[1:-1] << 8 | data[2:]
+        valid = (data[:-2] != 0) & (data[1:-1] != 0) & (data[2:] != 0)
+        pairs = np.sort(codes[valid].astype(np.int64) * len(texts) + rows[:-2][valid])
+        pairs = pairs[np.concatenate(([True], pairs[1:] != pairs[:-1]))]
+        return (pairs // len(texts)).astype(np.uint32), (pairs % len(texts)).astype(np.int32)
@@ -0,0 +1,102 @@
+import csv
+
+from pandas import DataFrame, Series, read_csv, concat, to_numeric
+from src.input_files.ColumnHeader import Header
+from logging import getLogger
+
+# Lines read per chunk. Keeps the memory of the raw attribute strings bounded for large genomes.
+CHUNK_SIZE = 500_000
+GTF_COLUMNS = ['seqname', 'source', 'feature', 'start', 'end', 'score', 'strand', 'frame', 'attribute']
+# Attributes of the gff3 hierarchy, which are used, if a line has no gene_id
+GFF3_ID = 'ID'
+GFF3_PARENT = 'Parent'
+# Prefixes of the gff3 IDs of Ensembl, the gtf and the quant files use the plain IDs
+GFF3_ID_PREFIX = r'^(?:gene|transcript):'
+# Deepest gff3 hierarchy, which is followed up to the gene, e.g. gene > mRNA > exon
+MAX_GFF3_DEPTH = 8
+
+
+class GtfReader:
+    """
+    Columnar reader for gtf and gff files. The nine columns are read in chunks with read_csv
+    and the gene_id and transcript_id are extracted from the attribute column for all lines at once.
+    Lines without gene_id, like in gff3, are mapped by their ID and Parent: the top of the hierarchy is the gene,
+    the feature below it the transcript.
+
+    :param file_path: str path to the gtf or gff file, may be compressed
+    :param chunk_size: int amount of lines, which are parsed at once
+    """
+
+    def __init__(self, file_path, chunk_size: int = CHUNK_SIZE):
+        self.file_path = file_path
+        self.chunk_size = chunk_size
+        self.logger = getLogger(__name__)
+
+    def get_table(self) -> DataFrame:
+        """
+        Return the annotation as table. Start positions are converted to 0-based coordinates, like BedTool does.
+
+        :return: Table with the columns gene_id, transcript_id, Chrom, Start and Stop
+        :rtype: pandas.DataFrame
+        """
+        chunks = [self.__parse_chunk(chunk) for chunk in
+                  read_csv(self.file_path, compression='infer', sep='\t', header=None,
+                           names=GTF_COLUMNS, usecols=[0, 3, 4, 8], quoting=csv.QUOTE_NONE,
+                           dtype={'seqname': str, 'attribute': str}, chunksize=self.chunk_size)]
+        if not chunks:
+            return DataFrame(columns=[Header.GENE_ID.value, Header.TRANSCRIPT_ID.value, Header.CHROM.value,
+                                      Header.START.value, Header.STOP.value])
+        table = concat(chunks, ignore_index=True)
+        # The hierarchy may span chunks, so it is resolved for the whole file
+        self.__set_ids_of_hierarchy(table)
+        table = table.drop(columns=[GFF3_ID, GFF3_PARENT])
+        dropped = int(table[Header.GENE_ID.value].isna().sum())
+        if dropped:
+            self.logger.warning('Dropped %d lines of %s, which have neither gene_id nor ID or Parent.',
+                                dropped, self.file_path)
+        return table.dropna(subset=[Header.GENE_ID.value]).reset_index(drop=True)
+
+    @staticmethod
+    def __set_ids_of_hierarchy(table: DataFrame):
+        missing = table[Header.GENE_ID.value].isna() & (table[GFF3_ID].notna() | table[GFF3_PARENT].notna())
+        if not missing.any():
+            return
+        features = table[table[GFF3_ID].notna()].drop_duplicates(subset=GFF3_ID)
+        parent_of = Series(features[GFF3_PARENT].to_numpy(), index=features[GFF3_ID].to_numpy())
+        # Walk up from each line. A line without ID, like an exon, starts at its parent.
+        current = table.loc[missing, GFF3_ID].fillna(table.loc[missing, GFF3_PARENT])
+        below = Series(None, index=current.index, dtype=object)
+        for _ in range(MAX_GFF3_DEPTH):
+            parents = current.map(parent_of)
+            has_parent = parents.notna()
+            if not has_parent.any():
+                break
+            below[has_parent] = current[has_parent]
+            current[has_parent] = parents[has_parent]
+        table.loc[missing, Header.GENE_ID.value] = current.str.replace(GFF3_ID_PREFIX, '', regex=True)
+        transcripts = below.str.replace(GFF3_ID_PREFIX, '', regex=True)
+        table.loc[missing, Header.TRANSCRIPT_ID.value] = \
+            table.loc[missing, Header.TRANSCRIPT_ID.value].fillna(transcripts)
+
+    @staticmethod
+    def __parse_chunk(chunk: DataFrame) -> DataFrame:
+        # Header lines (#, ##gff-version, ##FASTA) have no attribute column and are dropped here
+        chunk = chunk[~chunk['seqname'].str.startswith('#') & chunk['attribute'].notna()]
+        attribute = chunk['attribute']
+        table = DataFrame({
+            Header.GENE_ID.value: GtfReader.__extract_attribute(attribute, Header.GENE_ID.value),
+            Header.TRANSCRIPT_ID.value: GtfReader.__extract_attribute(attribute, Header.TRANSCRIPT_ID.value),
+            Header.CHROM.value: chunk['seqname'],
+            Header.START.value: to_numeric(chunk['start']).astype('int64') - 1,
+            Header.STOP.value: to_numeric(chunk['end']).astype('int64')})
+        # Only lines without gene_id are searched for the gff3 attributes, gtf files do not pay for them
+        without_gene = attribute[table[Header.GENE_ID.value].isna()]
+        table[GFF3_ID] = GtfReader.__extract_attribute(without_gene, GFF3_ID)
+        # A feature with several parents is mapped to its first
+        table[GFF3_PARENT] = GtfReader.__extract_attribute(without_gene, GFF3_PARENT, separators=',')
+        return table
+
+    @staticmethod
+    def __extract_attribute(attribute, key: str, separators: str = ''):
+        # Matches the gtf syntax (key "value";) and the gff syntax (key=value;), a value ends at the separators
+        return attribute.str.extract(r'(?:^|;)\s*' + key + r'[ =]"?([^";' + separators + r']+)"?', expand=False)
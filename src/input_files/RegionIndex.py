@@ -0,0 +1,222 @@
+import csv
+import gzip
+import re
+from concurrent.futures import Future
+from threading import Lock
+from time import perf_counter
+from logging import getLogger
+
+import numpy as np
+from pandas import DataFrame, read_csv, to_numeric, isna
+from src.input_files.File import FileInput
+from src.input_files.File_type import Filetype
+from src.input_files.ZoomPyramid import ZoomPyramid, TARGET_POINTS
+
+LOCUS_PATTERN = re.compile(r'^(?P<chrom>[^:\s]+):(?P<start>[\d,]+)-(?P<end>[\d,]+)$')
+HEADER_PREFIXES = ('track', 'browser', '#')
+BED_FIELDS = ['chr', 'start', 'end', 'name', 'score', 'strand',
+              'thickStart', 'thickEnd', 'itemRgb', 'blockCount', 'blockSizes', 'blockStarts']
+TEXT_FIELDS = {'chr': str, 'name': str, 'strand': str, 'itemRgb': str, 'blockSizes': str, 'blockStarts': str}
+
+
+def parse_locus(locus: str) -> tuple[str, int, int]:
+    """
+    Split a locus like chr1:1,000-2,000 into chromosome, start and end.
+
+    :param locus: str locus
+    :return: chromosome, start and end
+    :rtype: tuple[str, int, int]
+    :raise: ValueError if the locus is malformed
+    """
+    match = LOCUS_PATTERN.match((locus or '').strip())
+    if match is None:
+        raise ValueError(f'Malformed locus: {locus}')
+    start = int(match.group('start').replace(',', ''))
+    end = int(match.group('end').replace(',', ''))
+    if end < start:
+        raise ValueError(f'Malformed locus: {locus}')
+    return match.group('chrom'), start, end
+
+
+def read_track(path, file_type: Filetype) -> DataFrame:
+    """
+    Read a bedGraph or BED file, which may be gzipped. Leading track, browser and comment lines are skipped.
+
+    :param path: path of the file
+    :param file_type: Filetype.BEDGRAPH or Filetype.BED
+    :return: Table with the columns chr, start, end and value for bedGraph or the BED columns of the file
+    :rtype: pandas.DataFrame
+    """
+    header_lines, amount_of_columns = _inspect(path)
+    if file_type == Filetype.BEDGRAPH:
+        names, usecols = ['chr', 'start', 'end', 'value'], [0, 1, 2, 3]
+    else:
+        usecols = list(range(min(amount_of_columns, len(BED_FIELDS))))
+        names = BED_FIELDS[:len(usecols)]
+    table = read_csv(path, compression='infer', sep='\t', header=None, skiprows=header_lines,
+                     names=names, usecols=usecols, quoting=csv.QUOTE_NONE,
+                     dtype={name: kind for name, kind in TEXT_FIELDS.items() if name in names})
+    for column in ('score', 'thickStart', 'thickEnd', 'blockCount'):
+        if column in table.columns:
+            # BED allows '.' for unset values, they are not sent to igv.js
+            table[column] = to_numeric(table[column], errors='coerce')
+    return table
+
+
+def _inspect(path) -> tuple[int, int]:
+    opener = gzip.open if str(path).endswith('.gz') else open
+    header_lines = 0
+    with opener(path, 'rt') as file:
+        for line in file:
+            if line.startswith(HEADER_PREFIXES) or not line.strip():
+                header_lines += 1
+                continue
+            return header_lines, len(line.rstrip('\n').split('\t'))
+    return header_lines, len(BED_FIELDS)
+
+
+class IntervalIndex:
+    """
+    Sorted interval arrays per chromosome of a bedGraph or BED file. Overlapping features of a region are found
+    by binary search over the start positions. For bedGraph a ZoomPyramid is built per chromosome, which answers
+    windows with more than TARGET_POINTS intervals by binned summaries.
+
+    :param file: FileInput with Filetype.BEDGRAPH or Filetype.BED
+    """
+
+    def __init__(self, file: FileInput):
+        self.file_type = file.get_filetype()
+        self.chromosomes = dict()
+        table = read_track(file.get_filepath(), self.file_type)
+        for chrom, group in table.groupby(by='chr', sort=False):
+            group = group.sort_values(by='start', kind='stable')
+            starts = group['start'].to_numpy(dtype=np.int64)
+            ends = group['end'].to_numpy(dtype=np.int64)
+            columns = {column: group[column].to_numpy() for column in group.columns if column not in BED_FIELDS[:3]}
+            pyramid = None
+            # The summaries require non-overlapping intervals, like the bedGraph format demands
+            if self.file_type == Filetype.BEDGRAPH and not (starts[1:] < ends[:-1]).any():
+                pyramid = ZoomPyramid(starts, ends, columns['value'])
+            self.chromosomes[str(chrom)] = (starts, ends, int((ends - starts).max()), columns, pyramid)
+
+    def query(self, chrom: str, start: int, end: int) -> list[dict]:
+        """
+        Return the features, which overlap the region.
+
+        :param chrom: str chromosome, with or without the chr prefix
+        :param start: int 0-based start of the region
+        :param end: int end of the region
+        :return: features as dicts like igv.js expects them
+        :rtype: list[dict]
+        """
+        requested, chrom = chrom, self.__get_chromosome_alias(chrom)
+        if chrom is None:
+            return []
+        starts, ends, max_length, columns, pyramid = self.chromosomes[chrom]
+        low = np.searchsorted(starts, start - max_length, side='left')
+        high = np.searchsorted(starts, end, side='left')
+        if pyramid is not None and high - low > TARGET_POINTS:
+            bin_starts, bin_ends, mean, minimum, maximum, counts = \
+                pyramid.query(start, end, pyramid.get_bin_size(end - start))
+            return self.__get_features(requested, bin_starts, bin_ends,
+                                       dict(value=mean, min=minimum, max=maximum, count=counts))
+        hits = np.flatnonzero(ends[low:high] > start) + low
+        return self.__get_features(requested, starts[hits], ends[hits],
+                                   {column: values[hits] for column, values in columns.items()})
+
+    def __get_features(self, chrom: str, starts: np.ndarray, ends: np.ndarray, columns: dict) -> list[dict]:
+        features = {'start': starts.tolist(), 'end': ends.tolist()}
+        for column, values in columns.items():
+            missing = isna(values)
+            if missing.any():
+                # NaN is no valid json, neither in number nor in text columns like an empty name or strand
+                values = np.where(missing, None, values.astype(object))
+            features[column] = values.tolist()
+        # The chromosome is answered as requested, igv.js files the features under this name
+        features = [dict(chr=chrom, **dict(zip(features, values))) for values in zip(*features.values())]
+        if 'blockStarts' in columns:
+            for feature in features:
+                self.__set_exons(feature)
+        return features
+
+    @staticmethod
+    def __set_exons(feature: dict):
+        # BED12 blocks are relative to the feature start, igv.js expects absolut exons
+        sizes = str(feature.pop('blockSizes', '')).strip(',').split(',')
+        starts = str(feature.pop('blockStarts', '')).strip(',').split(',')
+        feature.pop('blockCount', None)
+        try:
+            feature['exons'] = [dict(start=feature['start'] + int(start), end=feature['start'] + int(start) + int(size))
+                                for start, size in zip(starts, sizes)]
+        except ValueError:
+            pass  # Malformed blocks are drawn as one feature
+
+    def __get_chromosome_alias(self, chrom: str) -> str or None:
+        # Genome and track files do not always agree on the chr prefix
+        for alias in (chrom, chrom[3:] if chrom.startswith('chr') else 'chr' + chrom):
+            if alias in self.chromosomes:
+                return alias
+        return None
+
+
+class RegionIndex:
+    """
+    Holds an IntervalIndex for each track. An index is built on the first request of the track or ahead of time
+    by the dataset loader. Requests for a track, whose index is being built, wait for the same build.
+    """
+
+    def __init__(self):
+        self.indexes = dict()
+        self.lock = Lock()
+        self.logger = getLogger(__name__)
+
+    def query(self, file: FileInput, locus: str) -> list[dict]:
+        """
+        Return the features of a track in a region.
+
+        :param file: FileInput with Filetype.BEDGRAPH or Filetype.BED
+        :param locus: str region like chr1:1000-2000
+        :return: features as dicts like igv.js expects them
+        :rtype: list[dict]
+        :raise: ValueError if the locus is malformed, TypeError if the track can not be indexed
+        """
+        if file.get_filetype() not in [Filetype.BEDGRAPH, Filetype.BED]:
+            raise TypeError(f'{file.get_filename()} is no bedGraph or BED file.')
+        chrom, start, end = parse_locus(locus)
+        return self.get_index(file).query(chrom, start, end)
+
+    def get_index(self, file: FileInput) -> IntervalIndex:
+        """
+        Return the index of a track and build it, if it does not exist.
+
+        :param file: FileInput with Filetype.BEDGRAPH or Filetype.BED
+        :return: index of the track
+        :rtype: IntervalIndex
+        """
+        with self.lock:
+            future = self.indexes.get(file.get_filename())
+            is_builder = future is None
+            if is_builder:
+                future = Future()
+                self.indexes[file.get_filename()] = future
+        if is_builder:
+            start_time = perf_counter()
+            try:
+                future.set_result(IntervalIndex(file))
+            except Exception as error:
+                # A failed build is not cached, the next request tries again
+                with self.lock:
+                    self.indexes.pop(file.get_filename(), None)
+                future.set_exception(error)
+                raise
+            self.logger.info('Indexed %s in %.2f s.', file.get_filename(), perf_counter() - start_time)
+        return future.result()
+
+    def invalidate(self, filename: str):
+        """
+        Drop the index of a track, e.g. if the file changed.
+
+        :param filename: str name of the track
+        """
+        with self.lock:
+            self.indexes.pop(filename, None)
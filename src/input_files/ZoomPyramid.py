@@ -0,0 +1,92 @@
+import numpy as np
+
+# Amount of data points, which a response should hold at most, about the width of the igv-component in pixels
+TARGET_POINTS = 1000
+
+
+class ZoomPyramid:
+    """
+    Binned summaries of the coverage of one chromosome at powers-of-two bin sizes. Each level keeps the sum,
+    the amount of covered bases, the minimum and the maximum value per bin. The finest bin size is chosen so that
+    the finest level has about half as many bins as there are intervals, so the pyramid is smaller than the data.
+
+    :param starts: sorted 0-based starts of non-overlapping intervals
+    :param ends: ends of the intervals
+    :param values: values of the intervals
+    """
+
+    def __init__(self, starts: np.ndarray, ends: np.ndarray, values: np.ndarray):
+        self.levels = []
+        span = int(ends.max()) if len(ends) else 0
+        bin_size = 1 << max(int(np.ceil(np.log2(max(2 * span / max(len(starts), 1), 1)))), 0)
+        level = self.__get_finest_level(starts, ends, values.astype(np.float64), span, bin_size)
+        while True:
+            self.levels.append((bin_size, *level))
+            if len(level[0]) <= 1:
+                break
+            level = self.__get_coarser_level(*level)
+            bin_size *= 2
+
+    def get_bin_size(self, width: int) -> int:
+        """
+        Return the smallest bin size, which answers a window with at most TARGET_POINTS bins.
+
+        :param width: int width of the window in bases
+        :return: bin size of a level
+        :rtype: int
+        """
+        for level in self.levels:
+            if level[0] * TARGET_POINTS >= width:
+                return level[0]
+        return self.levels[-1][0]
+
+    def query(self, start: int, end: int, bin_size: int) -> tuple[np.ndarray, ...]:
+        """
+        Return the covered bins of a level, which overlap the window.
+
+        :param start: int 0-based start of the window
+        :param end: int end of the window
+        :param bin_size: int bin size of the level
+        :return: starts, ends, mean, minimum, maximum and covered bases of the bins
+        :rtype: tuple[np.ndarray, ...]
+        """
+        _, sums, counts, minimum, maximum = next(level for level in self.levels if level[0] == bin_size)
+        low = min(max(start // bin_size, 0), len(sums))
+        high = min(max(-(-end // bin_size), low), len(sums))
+        covered = np.flatnonzero(counts[low:high] > 0) + low
+        bin_starts = covered.astype(np.int64) * bin_size
+        mean = sums[covered] / counts[covered]
+        return (bin_starts, bin_starts + bin_size, mean, minimum[covered], maximum[covered], counts[covered])
+
+    @staticmethod
+    def __get_finest_level(starts, ends, values, span: int, bin_size: int):
+        edges = np.arange(0, span + bin_size, bin_size, dtype=np.int64)
+        # The integral of the coverage and of the covered bases at each bin edge, bins are differences of it
+        lengths = ends - starts
+        cumulative_sum = np.concatenate(([0.0], np.cumsum(values * lengths)))
+        cumulative_count = np.concatenate(([0], np.cumsum(lengths)))
+        before = np.searchsorted(starts, edges, side='right') - 1
+        inside = np.clip(edges - starts[np.maximum(before, 0)], 0, lengths[np.maximum(before, 0)])
+        inside = np.where(before >= 0, inside, 0)
+        integral = cumulative_sum[before + 1] - np.where(before >= 0, values[np.maximum(before, 0)] *
+                                                         (lengths[np.maximum(before, 0)] - inside), 0)
+        covered = cumulative_count[before + 1] - np.where(before >= 0, lengths[np.maximum(before, 0)] - inside, 0)
+        sums = np.diff(integral)
+        counts = np.diff(covered).astype(np.int64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            # A bin without an interval border is covered by a single interval, so its extremes are its mean
+            mean = sums / counts
+        minimum = mean.copy()
+        maximum = mean.copy()
+        for positions in (starts // bin_size, (ends - 1) // bin_size):
+            np.minimum.at(minimum, positions, values)
+            np.maximum.at(maximum, positions, values)
+        return sums, counts, minimum, maximum
+
+    @staticmethod
+    def __get_coarser_level(sums, counts, minimum, maximum):
+        if len(sums) % 2:
+            sums, counts = np.append(sums, 0.0), np.append(counts, 0)
+            minimum, maximum = np.append(minimum, np.nan), np.append(maximum, np.nan)
+        return (sums[0::2] + sums[1::2], counts[0::2] + counts[1::2],
+                np.fmin(minimum[0::2], minimum[1::2]), np.fmax(maximum[0::2], maximum[1::2]))
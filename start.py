@@ -1,19 +1,39 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
+import logging
 import pathlib
 import sys
 
-from src.app import app
-from src.components import ComponentHandler
-from src.input_files import ARGS, FilesHandler
+from src.app.StartupProfiler import profiler
+from src.input_files import ARGS
 
 
 def __start_application(args):
     if args.has_option('dir'):
-        handler = FilesHandler.FileHandler(args)
+        # The modules are imported here, so that -compile does not import the Dash stack
+        with profiler.stage('import data modules'):
+            from src.input_files import FilesHandler
+        if args.has_option('compile'):
+            FilesHandler.FileHandler(args).compile_expressions()
+            sys.exit(0)
+        # Imported before the datasets are loaded in the background, which would slow down the imports
+        with profiler.stage('import app modules'):
+            from src.app import app
+            from src.components import ComponentHandler
+        with profiler.stage('scan files'):
+            handler = FilesHandler.FileHandler(args)
+        if args.get_server() == 'gunicorn':
+            # Everything is loaded before the workers are forked, which start their own watcher
+            with profiler.stage('load datasets'):
+                handler.load_expressions()
+                handler.wait_for_datasets()
+        else:
+            handler.watch()
         component_handler = ComponentHandler.Component(handler)
+        profiler.report_datasets(handler)
         app.AppHandler(pathlib.Path.absolute(args.get_absolut_path('dir')), component_handler, args.get_port(),
-                       args.get_mode(), args.get_pwd())
+                       args.get_mode(), args.get_pwd(), args.get_host(), args.get_server(), args.get_workers(),
+                       args.get_threads())
     else:
         sys.stderr.write('error: No Argument was set.')
         args.parser.print_help()
@@ -22,5 +42,8 @@ def __start_application(args):
 
 if __name__ == '__main__':
     """Start the application via console"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
     arguments = ARGS.Args()
+    if arguments.get_profile_startup():
+        profiler.enable()
     __start_application(arguments)